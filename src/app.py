@@ -11,6 +11,7 @@ from src.utils.sanitize_token import sanitize_token
 
 from src.config.config_loader import get_config, AppConfig
 from src.bot.bot_logic import create_telegram_application
+from src.services.sheets import init_sheets
 
 # --- Logging Setup ---
 logging.basicConfig(
@@ -63,6 +64,10 @@ async def lifespan(app: FastAPI):
         logger.info(f"Loaded {len(app_settings.bot_configs)} bot configurations. Using token starting with {default_bot_token[:6]}... as default for PTB Application build.")
         # -------------------------------------------------
 
+        # Authorize the shared Sheets client up front instead of on the first request
+        logger.info("Initializing Google Sheets client...")
+        init_sheets()
+
         # Create and initialize the Telegram application (passing the default token)
         logger.info("Creating and initializing Telegram application...")
         telegram_app = create_telegram_application(default_token=default_bot_token)
@@ -1,5 +1,6 @@
 """Handlers for the direct /log command (text and photo)."""
 
+import asyncio
 import logging
 from datetime import date
 import dateparser
@@ -134,7 +135,8 @@ async def _process_metric_update(
 
         # Call update_metrics if updates were prepared
         if updates:
-            success = update_metrics(
+            success = await asyncio.to_thread(
+                update_metrics,
                 sheet_id=sheet_id,
                 worksheet_name=worksheet_name,
                 target_dt=target_date,
@@ -219,7 +221,8 @@ async def _handle_photo_log(update: Update, context: ContextTypes.DEFAULT_TYPE,
         target_date = date.today() # Default to today for direct photo log
         sheet_date_str = format_date_for_sheet(target_date)
         logger.info("_handle_photo_log: Calling add_nutrition...")
-        success = add_nutrition(
+        success = await asyncio.to_thread(
+            add_nutrition,
             sheet_id=sheet_id,
             worksheet_name=worksheet_name,
             target_dt=target_date,
@@ -308,7 +311,8 @@ async def _handle_text_log(update: Update, context: ContextTypes.DEFAULT_TYPE, s
                 await processing_message.edit_text("Sorry, I couldn't retrieve nutritional information. Please try again or use /newlog for a guided experience.")
                 return
 
-            success = add_nutrition(
+            success = await asyncio.to_thread(
+                add_nutrition,
                 sheet_id=sheet_id,
                 worksheet_name=worksheet_name,
                 target_dt=target_date,
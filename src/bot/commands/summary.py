@@ -4,12 +4,12 @@ import logging
 from datetime import date, timedelta
 import html
 import statistics
-from typing import Dict # Import Dict
+from typing import Dict, List, Tuple # Import Dict
 from telegram import Update, Bot
 from telegram.ext import ContextTypes
 
 # Project imports
-from src.services.sheets import read_data_range, format_date_for_sheet
+from src.services.sheets import read_data_ranges_async, read_date_rows_async, format_date_for_sheet
 from src.bot.helpers import _get_current_sheet_config # Relative import from parent
 from src.config.config_loader import get_config 
 from src.utils.error_utils import log_error, send_error_message
@@ -34,6 +34,16 @@ def _calculate_average(values: list) -> float | None:
         return None # No valid values to average
     return statistics.mean(numeric_values)
 
+def _contiguous_col_ranges(col_indices: List[int]) -> List[Tuple[int, int]]:
+    """Groups column indices into sorted (start, end) runs of adjacent columns, both inclusive."""
+    col_ranges: List[Tuple[int, int]] = []
+    for col_idx in sorted(set(col_indices)):
+        if col_ranges and col_idx == col_ranges[-1][1] + 1:
+            col_ranges[-1] = (col_ranges[-1][0], col_idx)
+        else:
+            col_ranges.append((col_idx, col_idx))
+    return col_ranges
+
 # --- Summary Command Handlers --- 
 async def daily_summary_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Fetches and displays the calorie, macro, and step count for today."""
@@ -337,28 +347,40 @@ async def _fetch_and_process_summary_data(
          return None
     # --- ---
 
+    # Build the list of days up front so they can all be read in one request
+    days = []
     current_day = start_dt
     while current_day <= end_dt:
-        try:
-            # Fetch data for the current day using the new function
-            # read_data_range returns a single list for the row, or None
-            daily_data = read_data_range(
-                sheet_id, worksheet_name, current_day, min_col, max_col, bot_token
-            )
-
-            if daily_data is not None: # Check for None (error or not found), not just truthiness
-                all_rows_data.append(daily_data)
-            # If daily_data is None, it means the row wasn't found or an error occurred reading it.
-            # We simply skip that day for the summary calculation. Logging happens in read_data_range.
-
-        except Exception as e:
-            # Log unexpected errors during the loop, but try to continue
-            logger.error(f"Error fetching data for {current_day} in _fetch_and_process_summary_data loop: {e}", exc_info=True)
-            # Do not send message here, as it would spam for every failed day.
-            # The final summary will just be based on the days successfully fetched.
-        
+        days.append(current_day)
         current_day += timedelta(days=1) # Move to the next day
 
+    if len(days) == 1:
+        # A single day: fetch only the requested columns, in adjacent runs, rather than the whole
+        # min..max span (e.g. steps and the macro columns are far apart), and lay them back out
+        # as one min..max row so callers index it the same way.
+        col_ranges = _contiguous_col_ranges(indices_to_fetch)
+        range_values = await read_data_ranges_async(sheet_id, worksheet_name, days[0], col_ranges, bot_token)
+        results = None
+        if range_values is not None:
+            row = [None] * (max_col - min_col + 1)
+            for (start_col, end_col), values in zip(col_ranges, range_values):
+                # The API drops trailing empty cells, so a short run leaves None in the rest
+                values = values[:end_col - start_col + 1]
+                row[start_col - min_col:start_col - min_col + len(values)] = values
+            results = [row]
+    else:
+        # read_date_rows_async returns one list per day (None if the day has no row), or None on error
+        results = await read_date_rows_async(sheet_id, worksheet_name, days, min_col, max_col, bot_token)
+    if results is None:
+        # Details are logged by the reader (read_data_ranges also returns None when the day has
+        # no row); the summary falls back to "no data"
+        logger.warning(f"Could not read data for {start_dt} to {end_dt} in _fetch_and_process_summary_data")
+        results = []
+
+    for daily_data in results:
+        if daily_data is not None: # Skip days without a row
+            all_rows_data.append(daily_data)
+
     if not all_rows_data:
         logger.info(f"No data found for the date range: {start_dt} to {end_dt}")
         return [] # Return empty list, not None, to indicate no data found vs. error
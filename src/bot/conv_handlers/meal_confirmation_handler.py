@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import html
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
@@ -134,7 +135,8 @@ async def received_meal_confirmation(update: Update, context: ContextTypes.DEFAU
 
         # Call the actual function to add nutrition (using data from user_data)
         logger.info(f"received_meal_confirmation: Calling add_nutrition for {sheet_date_str} with final values")
-        success = add_nutrition(
+        success = await asyncio.to_thread(
+            add_nutrition,
             sheet_id=sheet_id,
             worksheet_name=worksheet_name,
             target_dt=target_date,
@@ -253,7 +255,8 @@ async def received_macro_edit(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     # --- Save Edited Data to Sheet --- 
     logger.info(f"received_macro_edit: Calling add_nutrition with EDITED values for {format_date_for_sheet(target_date)}")
-    success = add_nutrition(
+    success = await asyncio.to_thread(
+        add_nutrition,
         sheet_id=sheet_id,
         worksheet_name=worksheet_name,
         target_dt=target_date,
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from telegram import Update
 from telegram.ext import ContextTypes, ConversationHandler
@@ -220,7 +221,8 @@ async def received_metric_value(update: Update, context: ContextTypes.DEFAULT_TY
         # --- Call update_metrics AFTER processing all types ---
         if metric_updates_dict:
             logger.info(f"Calling update_metrics for {metric_type} with updates: {metric_updates_dict}")
-            success = update_metrics(
+            success = await asyncio.to_thread(
+                update_metrics,
                 sheet_id=sheet_id,
                 worksheet_name=worksheet_name,
                 target_dt=target_date,
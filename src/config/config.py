@@ -1,10 +1,27 @@
 """Configuration settings for the Calorie Tracker Bot."""
 
+import logging
 import os
 from dotenv import load_dotenv # Uncomment for local development with .env file
 
 load_dotenv() # Uncomment for local development
 
+logger = logging.getLogger(__name__)
+
+def _env_seconds(name: str, default: float) -> float:
+    """Reads a non-negative number of seconds from the environment, falling back to default if invalid."""
+    raw_value = os.getenv(name)
+    if raw_value is None:
+        return default
+    try:
+        seconds = float(raw_value)
+    except ValueError:
+        seconds = -1.0
+    if not seconds >= 0: # Also rejects NaN
+        logger.warning(f"Invalid {name} value '{raw_value}'. Using default {default}.")
+        return default
+    return seconds
+
 # --- Telegram Configuration ---
 # Replace with your actual Telegram Bot Token (obtained from BotFather)
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', 'YOUR_TELEGRAM_BOT_TOKEN_PLACEHOLDER')
@@ -19,6 +36,9 @@ WORKSHEET_NAME = os.getenv('WORKSHEET_NAME', 'Sheet1') # Adjust if your sheet na
 # IMPORTANT: Store this file securely and DO NOT commit it to version control.
 # Consider using GCP Secret Manager for production deployments.
 SERVICE_ACCOUNT_JSON = os.getenv('SERVICE_ACCOUNT_JSON', 'path/to/your/service_account.json')
+# Seconds a cached copy of a worksheet's date column is trusted before it is re-read.
+# Rows added by hand in the sheet are picked up after at most this long.
+SHEETS_DATE_COLUMN_TTL_SECONDS = _env_seconds('SHEETS_DATE_COLUMN_TTL_SECONDS', 30.0)
 # Google API Scopes needed
 SCOPES = [
     'https://www.googleapis.com/auth/spreadsheets',
@@ -5,15 +5,39 @@ import json
 import os
 from typing import List, Dict, Any
 from src.services.ai_models import AIModelManager
+from src.utils.sanitize_token import strip_code_fence
 # Import the types module from google.genai for proper image formatting
 from google import genai
 
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
 logger = logging.getLogger(__name__)
 
+# The vision prompt doesn't depend on the image, so it's built once rather than per call
+_MEAL_IMAGE_PROMPT = """
+        Analyze this image of food. Identify each distinct food item visible.
+        For each item, estimate its quantity in grams (g).
+        - Use standard serving sizes as a reference (e.g., a side of broccoli ~ 100g, a chicken breast ~ 150g).
+        - Consider the portion size relative to the plate or container.
+        - If multiple servings are visible, estimate the total quantity.
+
+        Output ONLY a valid JSON list where each element is an object with two keys:
+        1. "item": The name of the food item (string).
+        2. "quantity_g": The estimated quantity in grams (numeric).
+
+        Example Output: [{"item": "chicken breast", "quantity_g": 150.0}, {"item": "broccoli", "quantity_g": 100.0}, {"item": "rice", "quantity_g": 180.0}]
+        """
+
+def _coerce_meal_item(item: Any) -> Dict[str, Any] | None:
+    """Returns {'item', 'quantity_g'} for one parsed entry with quantity_g as a float,
+    or None if the entry isn't an object with a string name and a numeric quantity.
+    """
+    if not isinstance(item, dict):
+        return None
+    name = item.get('item')
+    quantity_g = item.get('quantity_g')
+    if isinstance(name, str) and isinstance(quantity_g, (int, float)):
+        return {'item': name, 'quantity_g': float(quantity_g)} # Ensure float
+    return None
+
 def parse_meal_text_with_gemini(meal_text: str) -> List[Dict[str, Any]] | None:
     """Parse meal text using Gemini API to extract food items and quantities."""
     try:
@@ -48,24 +72,22 @@ def parse_meal_text_with_gemini(meal_text: str) -> List[Dict[str, Any]] | None:
             config=generation_config_dict
         )
         # Clean up potential markdown code fences and surrounding text/whitespace
-        cleaned_text = response.text.strip().lstrip('```json').rstrip('```').strip()
-        logger.debug(f"Raw Gemini response: {response.text}")
-        logger.debug(f"Cleaned Gemini response: {cleaned_text}")
+        raw_text = response.text # Read once; the SDK assembles .text from the response parts on each access
+        cleaned_text = strip_code_fence(raw_text)
+        logger.debug("Raw Gemini response: %s", raw_text)
+        logger.debug("Cleaned Gemini response: %s", cleaned_text)
 
         parsed_json = json.loads(cleaned_text)
 
         if isinstance(parsed_json, list):
              validated_list = []
-             all_valid = True
              for item in parsed_json:
-                 if isinstance(item, dict) and 'item' in item and 'quantity_g' in item and isinstance(item['item'], str) and isinstance(item['quantity_g'], (int, float)):
-                     validated_list.append({
-                         'item': item['item'],
-                         'quantity_g': float(item['quantity_g']) # Ensure float
-                     })
-                 else:
+                 meal_item = _coerce_meal_item(item)
+                 if meal_item is None:
                      logger.warning(f"Invalid item structure in Gemini response: {item}")
-                     all_valid = False
+                     continue
+                 validated_list.append(meal_item)
+             all_valid = len(validated_list) == len(parsed_json)
 
              if not validated_list:
                  logger.error("Gemini response parsed, but no valid items found.")
@@ -104,20 +126,6 @@ def parse_meal_image_with_gemini(image_data: bytes) -> List[Dict[str, Any]] | No
     """
     logger.info("Sending meal image to Gemini for parsing")
     try:
-        prompt = """
-        Analyze this image of food. Identify each distinct food item visible.
-        For each item, estimate its quantity in grams (g).
-        - Use standard serving sizes as a reference (e.g., a side of broccoli ~ 100g, a chicken breast ~ 150g).
-        - Consider the portion size relative to the plate or container.
-        - If multiple servings are visible, estimate the total quantity.
-
-        Output ONLY a valid JSON list where each element is an object with two keys:
-        1. "item": The name of the food item (string).
-        2. "quantity_g": The estimated quantity in grams (numeric).
-
-        Example Output: [{"item": "chicken breast", "quantity_g": 150.0}, {"item": "broccoli", "quantity_g": 100.0}, {"item": "rice", "quantity_g": 180.0}]
-        """
-        
         # Use a dictionary for generation_config 
         generation_config_dict = {"temperature": 0.2}
 
@@ -130,7 +138,7 @@ def parse_meal_image_with_gemini(image_data: bytes) -> List[Dict[str, Any]] | No
 
         # Create contents with image part first, followed by the prompt text
         # This ordering can improve model performance with visual content according to Google's documentation
-        contents = [image_part, prompt]
+        contents = [image_part, _MEAL_IMAGE_PROMPT]
 
         response = AIModelManager.generate_content(
             use_case='meal_vision',
@@ -138,24 +146,22 @@ def parse_meal_image_with_gemini(image_data: bytes) -> List[Dict[str, Any]] | No
             config=generation_config_dict
         )
         
-        cleaned_text = response.text.strip().lstrip('```json').rstrip('```').strip()
-        logger.debug(f"Raw Gemini vision response: {response.text}")
-        logger.debug(f"Cleaned Gemini vision response: {cleaned_text}")
+        raw_text = response.text
+        cleaned_text = strip_code_fence(raw_text)
+        logger.debug("Raw Gemini vision response: %s", raw_text)
+        logger.debug("Cleaned Gemini vision response: %s", cleaned_text)
         
         parsed_json = json.loads(cleaned_text)
         
         if isinstance(parsed_json, list):
             validated_list = []
-            all_valid = True
             for item in parsed_json:
-                if isinstance(item, dict) and 'item' in item and 'quantity_g' in item and isinstance(item['item'], str) and isinstance(item['quantity_g'], (int, float)):
-                    validated_list.append({
-                        'item': item['item'],
-                        'quantity_g': float(item['quantity_g'])  # Ensure float
-                    })
-                else:
+                meal_item = _coerce_meal_item(item)
+                if meal_item is None:
                     logger.warning(f"Invalid item structure in Gemini vision response: {item}")
-                    all_valid = False
+                    continue
+                validated_list.append(meal_item)
+            all_valid = len(validated_list) == len(parsed_json)
             
             if not validated_list:
                 logger.error("Gemini vision response parsed, but no valid items found.")
@@ -9,6 +9,7 @@ from typing import List, Dict, Any # Keep typing for consistency
 # Project Imports
 from src.config import config # Needed for nutrient map?
 from src.services.ai_models import AIModelManager # Import AI Manager
+from src.utils.sanitize_token import strip_code_fence
 
 logger = logging.getLogger(__name__)
 
@@ -44,9 +45,10 @@ def _estimate_nutrition_with_gemini(item_name: str, quantity_g: float) -> dict |
             config=generation_config_dict
         )
         
-        cleaned_text = response.text.strip().lstrip('```json').rstrip('```').strip()
-        logger.debug(f"Raw Gemini response: {response.text}")
-        logger.debug(f"Cleaned Gemini response: {cleaned_text}")
+        raw_text = response.text # .text is rebuilt from the response parts on every access
+        cleaned_text = strip_code_fence(raw_text)
+        logger.debug("Raw Gemini response: %s", raw_text)
+        logger.debug("Cleaned Gemini response: %s", cleaned_text)
         
         parsed_json = json.loads(cleaned_text)
 
@@ -9,16 +9,22 @@ Provides functions to:
 
 # Public API for the sheets service
 
+from .client import init_sheets
 from .utils import format_date_for_sheet
 from .rows import find_row_by_date, ensure_date_row
 from .updater import update_metrics, add_nutrition
-from .reader import read_data_range
+from .reader import read_data_range, read_data_ranges, read_data_ranges_async, read_date_rows, read_date_rows_async
 
 __all__ = [
+    'init_sheets',
     'format_date_for_sheet',
     'find_row_by_date',
     'ensure_date_row',
     'update_metrics',
     'add_nutrition',
     'read_data_range',
+    'read_data_ranges',
+    'read_data_ranges_async',
+    'read_date_rows',
+    'read_date_rows_async',
 ] 
\ No newline at end of file
@@ -2,10 +2,15 @@
 
 import logging
 import json
+import random
 import threading
-from typing import Optional, Dict
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
 import gspread
+from google.auth.transport.requests import AuthorizedSession
 from google.oauth2 import service_account
+from requests.adapters import HTTPAdapter
 from gspread.exceptions import APIError, WorksheetNotFound
 
 # Project imports
@@ -17,8 +22,107 @@ logger = logging.getLogger(__name__)
 # --- Singleton Client & Worksheet Cache --- 
 _gspread_client: Optional[gspread.Client] = None
 _gspread_client_lock = threading.Lock()
-_worksheet_cache: Dict[tuple[str, str], gspread.Worksheet] = {}
-_worksheet_cache_lock = threading.Lock()
+# Worksheet handles are kept in LRU order with a TTL so a multi-tenant bot doesn't grow the cache
+# without bound or hold on to handles (and their sheet metadata) indefinitely.
+WORKSHEET_CACHE_MAX_SIZE = 256
+WORKSHEET_CACHE_TTL_SECONDS = 600
+_worksheet_cache: "OrderedDict[tuple[str, str], tuple[float, gspread.Worksheet]]" = OrderedDict()
+_worksheet_cache_lock = threading.Lock() # Guards _worksheet_cache only; never held across a fetch
+# One lock per (sheet_id, worksheet_name) so concurrent misses on the same worksheet fetch it once,
+# while misses on different worksheets fetch in parallel. A key's lock is dropped when its worksheet
+# leaves the cache (or fails to load), so this stays bounded by the cache size plus fetches in flight.
+_worksheet_fetch_locks: Dict[Tuple[str, str], threading.Lock] = {}
+_worksheet_fetch_locks_lock = threading.Lock()
+
+# --- HTTP Connection Pool ---
+# requests keeps at most 10 pooled connections per host by default. Sheets calls run concurrently
+# in worker threads, so keep headroom above that and reuse connections instead of reopening them.
+HTTP_POOL_MAXSIZE = 32
+
+# --- Request Retry & Rate Limiting ---
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 503})
+# A 5xx can come back after the server already applied the request, so calls that aren't
+# safe to repeat (row inserts/appends) are only retried when rejected up front with a 429.
+RATE_LIMIT_STATUS_CODES = frozenset({429})
+MAX_REQUEST_ATTEMPTS = 5
+RETRY_BASE_DELAY_SECONDS = 1.0
+RETRY_MAX_DELAY_SECONDS = 30.0
+# Caps Sheets requests in flight at once across threads. The per-minute quota itself is
+# enforced server-side; requests over it come back as 429s and are retried with backoff.
+MAX_CONCURRENT_REQUESTS = 60
+_request_semaphore = threading.BoundedSemaphore(MAX_CONCURRENT_REQUESTS)
+
+def _call_with_retry(retryable_status_codes: frozenset, func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Calls func, retrying APIErrors whose status is in retryable_status_codes using exponential
+    backoff with full jitter, up to MAX_REQUEST_ATTEMPTS attempts. Other errors, and the final failure, are re-raised.
+    """
+    for attempt in range(1, MAX_REQUEST_ATTEMPTS + 1):
+        try:
+            with _request_semaphore:
+                return func(*args, **kwargs)
+        except APIError as e:
+            status_code = getattr(e.response, 'status_code', None)
+            if status_code not in retryable_status_codes or attempt == MAX_REQUEST_ATTEMPTS:
+                raise
+            delay = random.uniform(0, min(RETRY_MAX_DELAY_SECONDS, RETRY_BASE_DELAY_SECONDS * 2 ** (attempt - 1)))
+            logger.warning(f"Sheets API returned {status_code} (attempt {attempt}/{MAX_REQUEST_ATTEMPTS}). Retrying in {delay:.1f}s.")
+            time.sleep(delay)
+
+def _with_retry(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Calls a gspread request method, retrying rate-limit and transient server errors (429/500/503).
+    Only for reads and set-style writes, which are safe to repeat.
+    """
+    return _call_with_retry(RETRYABLE_STATUS_CODES, func, *args, **kwargs)
+
+def _with_rate_limit_retry(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Calls a gspread request method that isn't safe to repeat (e.g. inserting a row),
+    retrying only 429s, which the server rejects before applying anything.
+    """
+    return _call_with_retry(RATE_LIMIT_STATUS_CODES, func, *args, **kwargs)
+
+def _create_gspread_client() -> gspread.Client:
+    """Parses the service account credentials from config and authorizes a new gspread Client.
+    Raises:
+        ValueError: If configuration is missing or invalid.
+    """
+    config = get_config() # Get the singleton config
+
+    if not config.service_account_json_string:
+        logger.critical("Service account JSON string not available in config!")
+        raise ValueError("Missing service account credentials in configuration")
+
+    # Parse the JSON string from the config object
+    try:
+        service_account_info = json.loads(config.service_account_json_string)
+    except json.JSONDecodeError as e:
+        logger.critical(f"Failed to parse service account JSON from config: {e}")
+        log_snippet = config.service_account_json_string[:50] + "..." if config.service_account_json_string and len(config.service_account_json_string) > 50 else "(empty or None)"
+        logger.critical(f"Problematic JSON string snippet from config: {log_snippet}")
+        raise ValueError("Invalid service account JSON in configuration") from e
+
+    # Use the parsed dictionary for credentials
+    creds = service_account.Credentials.from_service_account_info(
+        service_account_info,
+        scopes=SCOPES
+    )
+    # One keep-alive session for every Sheets call, sized for concurrent requests.
+    # Retries stay in _with_retry, so the adapter doesn't retry on its own.
+    session = AuthorizedSession(creds)
+    session.mount("https://", HTTPAdapter(pool_maxsize=HTTP_POOL_MAXSIZE))
+    return gspread.Client(auth=creds, session=session)
+
+def init_sheets() -> bool:
+    """Eagerly creates the shared gspread client. Call once at application startup.
+    The client is assigned once and never replaced, so later lookups are a plain global read.
+    If this isn't called (or fails), _get_gspread_client initializes the client lazily instead.
+    Returns True if the client is ready, False if initialization failed.
+    """
+    try:
+        _get_gspread_client()
+        return True
+    except Exception as e:
+        logger.error(f"Sheets client initialization at startup failed; will retry on first use: {e}")
+        return False
 
 def _get_gspread_client() -> gspread.Client:
     """Authenticates and returns a shared gspread Client object using the single service account.
@@ -27,7 +131,7 @@ def _get_gspread_client() -> gspread.Client:
         RuntimeError: If client initialization fails unexpectedly.
     """
     global _gspread_client
-    # Check without lock first for performance
+    # Check without lock first for performance (always taken once init_sheets has run)
     if _gspread_client is not None:
         return _gspread_client
         
@@ -35,29 +139,8 @@ def _get_gspread_client() -> gspread.Client:
          # Double-check lock
          if _gspread_client is None:
             logger.info("Initializing shared gspread client...")
-            config = None # Ensure config is defined for error handling
             try:
-                config = get_config() # Get the singleton config
-
-                if not config.service_account_json_string:
-                    logger.critical("Service account JSON string not available in config!")
-                    raise ValueError("Missing service account credentials in configuration")
-
-                # Parse the JSON string from the config object
-                try:
-                    service_account_info = json.loads(config.service_account_json_string)
-                except json.JSONDecodeError as e:
-                    logger.critical(f"Failed to parse service account JSON from config: {e}")
-                    log_snippet = config.service_account_json_string[:50] + "..." if config.service_account_json_string and len(config.service_account_json_string) > 50 else "(empty or None)"
-                    logger.critical(f"Problematic JSON string snippet from config: {log_snippet}")
-                    raise ValueError("Invalid service account JSON in configuration") from e
-
-                # Use the parsed dictionary for credentials
-                creds = service_account.Credentials.from_service_account_info(
-                    service_account_info,
-                    scopes=SCOPES
-                )
-                _gspread_client = gspread.authorize(creds)
+                _gspread_client = _create_gspread_client()
                 logger.info("Successfully authorized shared gspread client.")
 
             except Exception as e:
@@ -72,44 +155,78 @@ def _get_gspread_client() -> gspread.Client:
          raise RuntimeError("Failed to initialize gspread client after lock attempt")
     return _gspread_client
 
+def _get_worksheet_fetch_lock(cache_key: Tuple[str, str]) -> threading.Lock:
+    """Returns the lock serializing fetches of one worksheet, creating it on first use."""
+    lock = _worksheet_fetch_locks.get(cache_key)
+    if lock is None:
+        with _worksheet_fetch_locks_lock:
+            lock = _worksheet_fetch_locks.setdefault(cache_key, threading.Lock())
+    return lock
+
+def _drop_worksheet_fetch_lock(cache_key: Tuple[str, str]) -> None:
+    """Forgets the fetch lock of a worksheet that is no longer cached.
+    A thread still holding the old lock can at worst cause one duplicate fetch.
+    """
+    with _worksheet_fetch_locks_lock:
+        _worksheet_fetch_locks.pop(cache_key, None)
+
+def _lookup_cached_worksheet(cache_key: Tuple[str, str]) -> Optional[gspread.Worksheet]:
+    """Returns the cached worksheet for cache_key if present and fresh, dropping it if expired."""
+    with _worksheet_cache_lock:
+        cached = _worksheet_cache.get(cache_key)
+        if cached is None:
+            return None
+        if time.monotonic() - cached[0] < WORKSHEET_CACHE_TTL_SECONDS:
+            _worksheet_cache.move_to_end(cache_key)
+            return cached[1]
+        del _worksheet_cache[cache_key] # Expired
+        return None
+
 def _get_worksheet(sheet_id: str, worksheet_name: str) -> Optional[gspread.Worksheet]:
-    """Gets a specific Worksheet object by ID and name, using caching.
+    """Gets a specific Worksheet object by ID and name, using an LRU cache with a TTL.
     Returns None if the worksheet cannot be accessed or found.
     """
     cache_key = (sheet_id, worksheet_name)
-    
-    # Check cache first (without lock for performance)
-    cached_ws = _worksheet_cache.get(cache_key)
-    if cached_ws is not None:
-        logger.debug(f"Returning cached worksheet for key: {cache_key}")
-        return cached_ws
-        
-    # If not in cache, acquire lock to fetch/create
-    with _worksheet_cache_lock:
-        # Double-check cache inside lock
-        cached_ws = _worksheet_cache.get(cache_key)
-        if cached_ws is not None:
-            logger.debug(f"Returning cached worksheet found inside lock for key: {cache_key}")
-            return cached_ws
-            
-        # Fetch worksheet if still not found
+
+    worksheet = _lookup_cached_worksheet(cache_key)
+    if worksheet is not None:
+        logger.debug("Returning cached worksheet for key: %s", cache_key)
+        return worksheet
+
+    with _get_worksheet_fetch_lock(cache_key):
+        # Double-check: another thread may have fetched it while we waited
+        worksheet = _lookup_cached_worksheet(cache_key)
+        if worksheet is not None:
+            logger.debug("Returning cached worksheet for key: %s", cache_key)
+            return worksheet
+
+        # Fetch worksheet if not cached
         logger.info(f"Worksheet cache miss for key: {cache_key}. Fetching...")
         try:
             client = _get_gspread_client()
             sheet = client.open_by_key(sheet_id)
             worksheet = sheet.worksheet(worksheet_name)
-            # Store in cache
-            _worksheet_cache[cache_key] = worksheet
-            logger.info(f"Successfully fetched and cached worksheet for key: {cache_key}")
-            return worksheet
         except APIError as e:
             logger.error(f"API Error accessing sheet '{sheet_id}', worksheet '{worksheet_name}': {e}", exc_info=True)
             if e.response.status_code == 403:
                  logger.error("Permission denied. Ensure the service account email has editor access to the sheet.")
-            return None
+            worksheet = None
         except WorksheetNotFound:
             logger.error(f"Worksheet named '{worksheet_name}' not found in Google Sheet ID '{sheet_id}'.")
-            return None
+            worksheet = None
         except Exception as e:
             logger.error(f"Unexpected error getting worksheet '{sheet_id}/{worksheet_name}': {e}", exc_info=True)
-            return None 
\ No newline at end of file
+            worksheet = None
+        if worksheet is None:
+            _drop_worksheet_fetch_lock(cache_key) # Nothing was cached for this key
+            return None
+
+        # Store in cache, evicting the least recently used entry if full
+        with _worksheet_cache_lock:
+            _worksheet_cache[cache_key] = (time.monotonic(), worksheet)
+            evicted_key = _worksheet_cache.popitem(last=False)[0] if len(_worksheet_cache) > WORKSHEET_CACHE_MAX_SIZE else None
+        if evicted_key is not None:
+            _drop_worksheet_fetch_lock(evicted_key)
+            logger.debug("Evicted worksheet for key: %s", evicted_key)
+        logger.info(f"Successfully fetched and cached worksheet for key: {cache_key}")
+        return worksheet
@@ -1,16 +1,33 @@
 """Functions for reading data from Google Sheets."""
 
+import asyncio
 import logging
 from datetime import datetime
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Tuple
 import gspread
 
 # Local imports
-from .utils import _get_bot_sheet_details, format_date_for_sheet # Import helper
-from .rows import find_row_by_date # Import row finding
+from .client import _with_retry
+from .utils import _get_bot_sheet_details, format_date_for_sheet, _col_letter # Import helpers
+from .rows import _find_row_by_date, _get_date_column_snapshot, _snapshot_row_for # Import row finding
 
 logger = logging.getLogger(__name__)
 
+# --- Async Read Concurrency ---
+# Google Sheets allows ~60 read requests/min/user; cap in-flight reads per event loop.
+READ_CONCURRENCY_LIMIT = 5
+_read_semaphore: Optional[asyncio.Semaphore] = None
+_read_semaphore_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def _get_read_semaphore() -> asyncio.Semaphore:
+    """Returns the read semaphore bound to the running event loop, creating it if needed."""
+    global _read_semaphore, _read_semaphore_loop
+    loop = asyncio.get_running_loop()
+    if _read_semaphore is None or _read_semaphore_loop is not loop:
+        _read_semaphore = asyncio.Semaphore(READ_CONCURRENCY_LIMIT)
+        _read_semaphore_loop = loop
+    return _read_semaphore
+
 def read_data_range(sheet_id: str, worksheet_name: str, target_dt: datetime.date, start_col_idx: int, end_col_idx: int, bot_token: str) -> Optional[List[Any]]:
     """Reads a horizontal range of cells for a specific date.
     Args:
@@ -30,10 +47,10 @@ def read_data_range(sheet_id: str, worksheet_name: str, target_dt: datetime.date
     if not details:
         logger.error(f"Could not get sheet details for bot {bot_token[:6]}... in read_data_range")
         return None
-    worksheet, _, _, _, _ = details # Don't need column_map etc. here, just the worksheet
+    worksheet = details.worksheet # Don't need column_map etc. here, just the worksheet
 
     # Find the row for the target date
-    row_index_0based = find_row_by_date(sheet_id, worksheet_name, target_dt, bot_token)
+    row_index_0based = _find_row_by_date(details, target_dt)
     if row_index_0based is None:
         logger.warning(f"Could not find row for {format_date_for_sheet(target_dt)} in {sheet_id}/{worksheet_name} to read data range.")
         return None # Return None if date row doesn't exist
@@ -48,23 +65,21 @@ def read_data_range(sheet_id: str, worksheet_name: str, target_dt: datetime.date
 
     try:
         # Construct A1 notation for the range
-        start_cell_a1 = gspread.utils.rowcol_to_a1(row_num_1based, start_col_1based)
-        end_cell_a1 = gspread.utils.rowcol_to_a1(row_num_1based, end_col_1based)
-        range_a1 = f"{start_cell_a1}:{end_cell_a1}"
+        range_a1 = f"{_col_letter(start_col_idx)}{row_num_1based}:{_col_letter(end_col_idx)}{row_num_1based}"
 
-        logger.debug(f"Reading data from range: {range_a1} in {worksheet.title}")
+        logger.debug("Reading data from range: %s in %s", range_a1, worksheet.title)
         # Fetch the values, preserving formatting (e.g., dates as strings)
         # Use UNFORMATTED_VALUE for numbers, FORMATTED_VALUE for dates/text? Check gspread docs.
         # Let's try UNFORMATTED_VALUE first for consistency with writes.
-        values = worksheet.get(range_a1, value_render_option='UNFORMATTED_VALUE')
+        values = _with_retry(worksheet.get, range_a1, value_render_option='UNFORMATTED_VALUE')
 
         if values:
             # values is a list of lists, e.g., [[val1, val2, val3]]
-            logger.debug(f"Successfully read values from {range_a1}: {values[0]}")
+            logger.debug("Successfully read values from %s: %s", range_a1, values[0])
             return values[0] # Return the inner list
         else:
             # Range exists but might be empty
-            logger.debug(f"Range {range_a1} found but contained no values.")
+            logger.debug("Range %s found but contained no values.", range_a1)
             # Return a list of Nones matching the expected range size
             num_cells = end_col_idx - start_col_idx + 1
             return [None] * num_cells
@@ -74,4 +89,129 @@ def read_data_range(sheet_id: str, worksheet_name: str, target_dt: datetime.date
          return None
     except Exception as e:
         logger.error(f"Unexpected error reading range {range_a1} for date {format_date_for_sheet(target_dt)}: {e}", exc_info=True)
-        return None 
\ No newline at end of file
+        return None
+
+def read_data_ranges(sheet_id: str, worksheet_name: str, target_dt: datetime.date, col_ranges: List[Tuple[int, int]], bot_token: str) -> Optional[List[List[Any]]]:
+    """Reads several horizontal ranges of the same date's row in a single batch_get request.
+    Args:
+        sheet_id: The ID of the Google Sheet.
+        worksheet_name: The name of the worksheet within the sheet.
+        target_dt: The date object for the row to read.
+        col_ranges: List of (start_col_idx, end_col_idx) pairs, 0-based and inclusive.
+        bot_token: The token of the bot making the request.
+
+    Returns:
+        One list of values per requested range, in order (a list of Nones for empty ranges),
+        or None if the row isn't found or an error occurs.
+    """
+    if not col_ranges:
+        return []
+
+    details = _get_bot_sheet_details(bot_token)
+    if not details:
+        logger.error(f"Could not get sheet details for bot {bot_token[:6]}... in read_data_ranges")
+        return None
+    worksheet = details.worksheet
+
+    for start_col_idx, end_col_idx in col_ranges:
+        if start_col_idx > end_col_idx:
+            logger.error(f"Invalid column range requested: start ({start_col_idx}) > end ({end_col_idx})")
+            return None
+
+    # Find the row for the target date once for all ranges
+    row_index_0based = _find_row_by_date(details, target_dt)
+    if row_index_0based is None:
+        logger.warning(f"Could not find row for {format_date_for_sheet(target_dt)} in {sheet_id}/{worksheet_name} to read data ranges.")
+        return None
+
+    row_num_1based = row_index_0based + 1
+    ranges_a1 = [f"{_col_letter(start)}{row_num_1based}:{_col_letter(end)}{row_num_1based}" for start, end in col_ranges]
+
+    try:
+        logger.debug("Batch reading ranges %s in %s", ranges_a1, worksheet.title)
+        value_ranges = _with_retry(worksheet.batch_get, ranges_a1, value_render_option='UNFORMATTED_VALUE')
+        results = []
+        for (start_col_idx, end_col_idx), values in zip(col_ranges, value_ranges):
+            results.append(values[0] if values else [None] * (end_col_idx - start_col_idx + 1))
+        return results
+
+    except gspread.exceptions.APIError as e:
+         logger.error(f"API error batch reading ranges {ranges_a1} for date {format_date_for_sheet(target_dt)}: {e}", exc_info=True)
+         return None
+    except Exception as e:
+        logger.error(f"Unexpected error batch reading ranges {ranges_a1} for date {format_date_for_sheet(target_dt)}: {e}", exc_info=True)
+        return None
+
+def read_date_rows(sheet_id: str, worksheet_name: str, target_dts: List[datetime.date], start_col_idx: int, end_col_idx: int, bot_token: str) -> Optional[List[Optional[List[Any]]]]:
+    """Reads the same horizontal range for several dates in a single batch_get request.
+    Rows are located from one (usually cached) read of the date column, and only the
+    requested columns are fetched instead of whole rows.
+    Args:
+        sheet_id: The ID of the Google Sheet.
+        worksheet_name: The name of the worksheet within the sheet.
+        target_dts: The dates to read, e.g. every day of a week.
+        start_col_idx: The starting 0-based column index of the range.
+        end_col_idx: The ending 0-based column index of the range (inclusive).
+        bot_token: The token of the bot making the request.
+
+    Returns:
+        One entry per date, in order: the list of values for that date's row
+        (a list of Nones if the range is empty), or None if the date has no row.
+        Returns None if an error occurs.
+    """
+    details = _get_bot_sheet_details(bot_token)
+    if not details:
+        logger.error(f"Could not get sheet details for bot {bot_token[:6]}... in read_date_rows")
+        return None
+    worksheet = details.worksheet
+
+    if start_col_idx > end_col_idx:
+        logger.error(f"Invalid column range requested: start ({start_col_idx}) > end ({end_col_idx})")
+        return None
+
+    num_cells = end_col_idx - start_col_idx + 1
+    results: List[Optional[List[Any]]] = [None] * len(target_dts)
+    ranges_a1 = []
+    try:
+        snapshot = _get_date_column_snapshot(details)
+        found = [] # (position in target_dts, 1-based row number)
+        for pos, target_dt in enumerate(target_dts):
+            row_index_0based = _snapshot_row_for(snapshot, target_dt)
+            if row_index_0based is None:
+                logger.debug("No row for %s in %s/%s", format_date_for_sheet(target_dt), sheet_id, worksheet_name)
+                continue
+            found.append((pos, row_index_0based + 1))
+        if not found:
+            return results
+
+        ranges_a1 = [f"{_col_letter(start_col_idx)}{row}:{_col_letter(end_col_idx)}{row}" for _, row in found]
+        logger.debug("Batch reading %s date rows in %s", len(ranges_a1), worksheet.title)
+        value_ranges = _with_retry(worksheet.batch_get, ranges_a1, value_render_option='UNFORMATTED_VALUE')
+        for (pos, _), values in zip(found, value_ranges):
+            results[pos] = values[0] if values else [None] * num_cells
+        return results
+
+    except gspread.exceptions.APIError as e:
+         logger.error(f"API error batch reading date rows {ranges_a1}: {e}", exc_info=True)
+         return None
+    except Exception as e:
+        logger.error(f"Unexpected error batch reading date rows {ranges_a1}: {e}", exc_info=True)
+        return None
+
+async def read_data_ranges_async(sheet_id: str, worksheet_name: str, target_dt: datetime.date, col_ranges: List[Tuple[int, int]], bot_token: str) -> Optional[List[List[Any]]]:
+    """Async variant of read_data_ranges for use from bot handlers, bounded like read_date_rows_async."""
+    async with _get_read_semaphore():
+        return await asyncio.to_thread(
+            read_data_ranges, sheet_id, worksheet_name, target_dt, col_ranges, bot_token
+        )
+
+async def read_date_rows_async(sheet_id: str, worksheet_name: str, target_dts: List[datetime.date], start_col_idx: int, end_col_idx: int, bot_token: str) -> Optional[List[Optional[List[Any]]]]:
+    """Async variant of read_date_rows for use from bot handlers.
+
+    The blocking gspread calls run in a worker thread so the event loop stays free.
+    Concurrency is bounded by READ_CONCURRENCY_LIMIT.
+    """
+    async with _get_read_semaphore():
+        return await asyncio.to_thread(
+            read_date_rows, sheet_id, worksheet_name, target_dts, start_col_idx, end_col_idx, bot_token
+        )
@@ -1,15 +1,238 @@
 """Functions for finding and managing rows in Google Sheets."""
 
+import bisect
+import calendar
 import logging
+import re
+import threading
+import time
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Dict, List, NamedTuple, Tuple
 import gspread
 
+# Project imports
+from src.config.config import SHEETS_DATE_COLUMN_TTL_SECONDS
+
 # Local imports
-from .utils import format_date_for_sheet, _get_bot_sheet_details
+from .client import _with_retry, _with_rate_limit_retry
+from .utils import format_date_for_sheet, _get_bot_sheet_details, SheetDetails
 
 logger = logging.getLogger(__name__)
 
+# --- Date Column Snapshot Cache ---
+class _DateColumnSnapshot(NamedTuple):
+    """Cached view of a worksheet's date column, starting at first_data_row."""
+    fetched_at: float
+    date_strings: List[str] # One entry per sheet row, '' for empty cells
+    date_to_idx: Dict[int, int] # Year-aware sort key -> 0-based row index
+    ordinals: List[int] # Year-aware sort keys of parseable dates, in sheet order
+    ordinal_rows: List[int] # 0-based row index for each entry in ordinals
+
+# Keyed by (sheet_id, worksheet_name). Kept short-lived since rows can also be added by hand in the sheet.
+DATE_COLUMN_TTL_SECONDS = SHEETS_DATE_COLUMN_TTL_SECONDS
+_date_column_cache: Dict[Tuple[str, str], _DateColumnSnapshot] = {}
+_date_column_cache_lock = threading.Lock()
+# Rows re-read from the end of an expired snapshot to check it still lines up with the sheet
+DATE_COLUMN_TAIL_PROBE_ROWS = 5
+
+# Sheet dates carry no year, so day counts use a leap reference year to keep 'Feb 29' valid.
+_MONTH_NUMBERS = {abbr.lower(): num for num, abbr in enumerate(calendar.month_abbr) if abbr}
+_DAYS_IN_MONTH = {num: calendar.monthrange(2000, num)[1] for num in range(1, 13)}
+_DAYS_BEFORE_MONTH = {num: sum(_DAYS_IN_MONTH[m] for m in range(1, num)) for num in range(1, 13)}
+# Snapshot sort keys are year_offset * _YEAR_KEY_STRIDE + MMDD, where year_offset counts how often
+# the (chronological) date column has wrapped around from December back to January so far.
+_YEAR_KEY_STRIDE = 10000
+
+# First row number of an A1 range such as "Sheet1!A47:Z47" or "'My Sheet'!A47:Z47"
+_UPDATED_RANGE_ROW_RE = re.compile(r'!\$?[A-Za-z]+\$?(\d+)')
+
+def _sheet_date_ordinal(date_str: str) -> Optional[int]:
+    """Converts a sheet date string ('Jul 16') into a sortable MMDD key (716), or None if unparseable.
+    Uses a month-abbreviation lookup rather than strptime, since this runs once per row on every fetch.
+    """
+    try:
+        month_abbr, day_str = date_str.split()
+        month = _MONTH_NUMBERS[month_abbr.lower()]
+        day = int(day_str)
+    except (ValueError, KeyError, AttributeError):
+        return None
+    if not 1 <= day <= _DAYS_IN_MONTH[month]:
+        return None
+    return month * 100 + day
+
+def _approx_day_number(year: int, ordinal: int) -> int:
+    """Day count for a year and MMDD ordinal, exact enough to compare dates about a year apart."""
+    return year * 366 + _DAYS_BEFORE_MONTH[ordinal // 100] + ordinal % 100
+
+def _target_sort_key(ordinals: List[int], target_dt: datetime.date) -> int:
+    """Returns target_dt's sort key on the same scale as a snapshot's year-aware ordinals.
+    Sheet dates carry no year, so the last dated row is placed in whichever year puts it
+    closest to target_dt, and target_dt's year offset is counted from there.
+    """
+    target_ordinal = target_dt.month * 100 + target_dt.day
+    if not ordinals:
+        return target_ordinal
+    last_offset, last_ordinal = divmod(ordinals[-1], _YEAR_KEY_STRIDE)
+    target_day = _approx_day_number(target_dt.year, target_ordinal)
+    last_year = min(
+        (target_dt.year - 1, target_dt.year, target_dt.year + 1),
+        key=lambda year: abs(_approx_day_number(year, last_ordinal) - target_day)
+    )
+    return (last_offset + target_dt.year - last_year) * _YEAR_KEY_STRIDE + target_ordinal
+
+def invalidate_date_column_cache(sheet_id: Optional[str] = None, worksheet_name: Optional[str] = None) -> None:
+    """Drops the cached date column for one worksheet, or for all worksheets if no key is given."""
+    with _date_column_cache_lock:
+        if sheet_id is None:
+            _date_column_cache.clear()
+        else:
+            _date_column_cache.pop((sheet_id, worksheet_name), None)
+
+def _store_date_column_snapshot(details: SheetDetails, date_values: List[List]) -> _DateColumnSnapshot:
+    """Builds a snapshot from fetched date column values and caches it."""
+    first_data_row = details.first_data_row
+    snapshot = _DateColumnSnapshot(time.monotonic(), [], {}, [], [])
+    year_offset, prev_ordinal = 0, None
+
+    for i, row_list in enumerate(date_values):
+        # Empty cells/rows are kept as '' so list positions stay aligned with sheet rows
+        date_str = row_list[0] if row_list and row_list[0] else ''
+        snapshot.date_strings.append(date_str)
+        if not date_str:
+            continue
+        row_idx = i + first_data_row
+        ordinal = _sheet_date_ordinal(date_str)
+        if ordinal is None:
+            logger.warning(f"Could not parse sheet date '{date_str}' at row {row_idx + 1}; ignoring it for insert ordering.")
+            continue
+        if prev_ordinal is not None and ordinal < prev_ordinal:
+            year_offset += 1 # Wrapped into a new year, e.g. 'Dec 31' followed by 'Jan 1'
+        prev_ordinal = ordinal
+        sort_key = year_offset * _YEAR_KEY_STRIDE + ordinal
+        snapshot.ordinals.append(sort_key)
+        snapshot.ordinal_rows.append(row_idx)
+        # Keyed like the ordering, so last January's 'Jan 5' doesn't answer for this year's.
+        # First occurrence wins, as with the old linear scan.
+        snapshot.date_to_idx.setdefault(sort_key, row_idx)
+
+    with _date_column_cache_lock:
+        _date_column_cache[(details.sheet_id, details.worksheet_name)] = snapshot
+    return snapshot
+
+def _snapshot_row_for(snapshot: _DateColumnSnapshot, target_dt: datetime.date) -> Optional[int]:
+    """Returns the 0-based row holding target_dt in the snapshot, or None if it has no row."""
+    return snapshot.date_to_idx.get(_target_sort_key(snapshot.ordinals, target_dt))
+
+def _peek_cached_date_row(details: SheetDetails, target_dt: datetime.date) -> Tuple[Optional[int], bool]:
+    """Looks a date up in the cached snapshot without fetching, even if the snapshot has expired.
+    Returns (row_idx or None, whether the snapshot is still fresh). A row from an expired
+    snapshot is only a hint and must be re-validated against a fresh read of the date column.
+    """
+    cached = _date_column_cache.get((details.sheet_id, details.worksheet_name))
+    if cached is None:
+        return None, False
+    is_fresh = time.monotonic() - cached.fetched_at < DATE_COLUMN_TTL_SECONDS
+    return _snapshot_row_for(cached, target_dt), is_fresh
+
+def _refresh_snapshot_tail(details: SheetDetails, stale: _DateColumnSnapshot) -> Optional[_DateColumnSnapshot]:
+    """Refreshes an expired snapshot by re-reading only its last few rows plus anything below them.
+    New dates are almost always appended at the bottom, so if the re-read rows still match the
+    snapshot, the rows above are assumed unchanged. Returns None if they don't match (rows were
+    inserted or deleted above), in which case the caller re-reads the whole column.
+    """
+    num_rows = len(stale.date_strings)
+    if num_rows < DATE_COLUMN_TAIL_PROBE_ROWS:
+        return None # The full column is just as small
+    kept_rows = num_rows - DATE_COLUMN_TAIL_PROBE_ROWS
+    letter = details.date_col_letter
+    tail_range_a1 = f"{letter}{details.first_data_row + kept_rows + 1}:{letter}"
+    logger.debug("Probing date column tail: %s", tail_range_a1)
+    tail_values = _with_retry(details.worksheet.get, tail_range_a1)
+
+    tail_strings = [row_list[0] if row_list and row_list[0] else '' for row_list in tail_values]
+    if tail_strings[:DATE_COLUMN_TAIL_PROBE_ROWS] != stale.date_strings[kept_rows:]:
+        logger.debug("Date column tail changed since the last snapshot; refetching the whole column")
+        return None
+    kept_values = [[date_str] if date_str else [] for date_str in stale.date_strings[:kept_rows]]
+    return _store_date_column_snapshot(details, kept_values + list(tail_values))
+
+def _get_date_column_snapshot(details: SheetDetails) -> _DateColumnSnapshot:
+    """Returns the snapshot of the worksheet's date column, fetching it on a cache miss.
+    Raises gspread exceptions from the fetch; callers handle them.
+    """
+    cached = _date_column_cache.get((details.sheet_id, details.worksheet_name))
+    if cached is not None and time.monotonic() - cached.fetched_at < DATE_COLUMN_TTL_SECONDS:
+        return cached
+    if cached is not None:
+        refreshed = _refresh_snapshot_tail(details, cached)
+        if refreshed is not None:
+            return refreshed
+
+    # Fetch only the date column values from first_data_row down
+    logger.debug("Fetching date column range: %s", details.date_col_range)
+    date_values = _with_retry(details.worksheet.get, details.date_col_range)
+    return _store_date_column_snapshot(details, date_values)
+
+def _appended_row_idx(append_response) -> Optional[int]:
+    """Returns the 0-based row index a values.append call wrote to, parsed from its updatedRange.
+    Returns None if the response doesn't carry a parseable range.
+    """
+    if not isinstance(append_response, dict):
+        return None
+    updated_range = append_response.get('updates', {}).get('updatedRange')
+    match = _UPDATED_RANGE_ROW_RE.search(updated_range) if isinstance(updated_range, str) else None
+    if not match:
+        return None
+    return int(match.group(1)) - 1
+
+def _record_inserted_date(sheet_id: str, worksheet_name: str, insert_position: int, first_data_row: int, target_dt: datetime.date) -> None:
+    """Splices a newly inserted date row into the cached snapshot so it stays aligned with the sheet.
+    Builds a new snapshot and swaps it in, since readers use cached snapshots without the lock.
+    """
+    cache_key = (sheet_id, worksheet_name)
+    with _date_column_cache_lock:
+        snapshot = _date_column_cache.get(cache_key)
+        if snapshot is None:
+            return
+        target_key = _target_sort_key(snapshot.ordinals, target_dt) # Before the row shifts anything
+        date_strings = list(snapshot.date_strings)
+        date_strings.insert(insert_position - first_data_row, format_date_for_sheet(target_dt))
+        # Rows at or below the insert point moved down by one
+        date_to_idx = {
+            sort_key: row_idx + 1 if row_idx >= insert_position else row_idx
+            for sort_key, row_idx in snapshot.date_to_idx.items()
+        }
+        date_to_idx[target_key] = insert_position
+
+        pos = bisect.bisect_right(snapshot.ordinals, target_key)
+        ordinals = snapshot.ordinals[:pos] + [target_key] + snapshot.ordinals[pos:]
+        ordinal_rows = snapshot.ordinal_rows[:pos] + [insert_position] + [row_idx + 1 for row_idx in snapshot.ordinal_rows[pos:]]
+        _date_column_cache[cache_key] = snapshot._replace(
+            date_strings=date_strings, date_to_idx=date_to_idx, ordinals=ordinals, ordinal_rows=ordinal_rows
+        )
+
+def _find_or_locate_insert(details: SheetDetails, target_dt: datetime.date) -> Tuple[Optional[int], int, int]:
+    """Looks up a date with a single (usually cached) read of the date column.
+    Returns (found_row_idx or None, insert_position, number of date rows), all row values 0-based.
+    insert_position is where the date belongs chronologically if it is missing.
+    """
+    snapshot = _get_date_column_snapshot(details)
+    num_date_rows = len(snapshot.date_strings)
+    target_key = _target_sort_key(snapshot.ordinals, target_dt)
+    found_row_idx = snapshot.date_to_idx.get(target_key)
+    if found_row_idx is not None:
+        return found_row_idx, found_row_idx, num_date_rows
+
+    # Sheet dates are kept in chronological order, so bisect on their year-aware ordinals
+    # (string comparison misorders months, e.g. 'Apr 10' < 'Jan 2', and a plain MMDD key
+    # would put 'Jan 3' above the previous December's rows).
+    pos = bisect.bisect_right(snapshot.ordinals, target_key)
+    if pos < len(snapshot.ordinal_rows):
+        insert_position = snapshot.ordinal_rows[pos] # Before the first later date
+    else:
+        # If no later date was found, insert after the last data row
+        insert_position = details.first_data_row + num_date_rows
+    return None, insert_position, num_date_rows
 
 def find_row_by_date(sheet_id: str, worksheet_name: str, target_dt: datetime.date, bot_token: str) -> int | None:
     """Finds the 0-based row index for a given date in the worksheet.
@@ -18,38 +241,19 @@ def find_row_by_date(sheet_id: str, worksheet_name: str, target_dt: datetime.dat
     details = _get_bot_sheet_details(bot_token)
     if not details:
         return None
-    worksheet, column_map, first_data_row, _, _ = details
-    date_col_idx = column_map['DATE_COL_IDX'] # Already validated in helper
+    return _find_row_by_date(details, target_dt)
 
+def _find_row_by_date(details: SheetDetails, target_dt: datetime.date) -> int | None:
+    """find_row_by_date for callers that already resolved the bot's SheetDetails."""
     try:
         target_date_str = format_date_for_sheet(target_dt)
 
-        # Get the date column values, starting from first_data_row
-        last_row = worksheet.row_count
-        if last_row < first_data_row + 1: # Check if there are any data rows at all
-            logger.debug(f"No data rows found in worksheet (last_row: {last_row}, first_data_row: {first_data_row})")
-            return None
-
-        # Fetch only the date column values from first_data_row to last_row
-        # +1 for indices because gspread uses 1-based indexing
-        date_range_a1 = f"{gspread.utils.rowcol_to_a1(first_data_row + 1, date_col_idx + 1)[0]}{first_data_row + 1}:{gspread.utils.rowcol_to_a1(last_row, date_col_idx + 1)[0]}{last_row}"
-        logger.debug(f"Fetching date column range: {date_range_a1}")
-        date_values = worksheet.get(date_range_a1)
-
-        # Search for the target date in the fetched values
-        for i, row_list in enumerate(date_values):
-            # Skip empty cells/rows
-            if not row_list or not row_list[0]:
-                continue
-            
-            # Compare the date value
-            if row_list[0] == target_date_str:
-                # Convert list index `i` back to 0-based sheet row index
-                found_row_idx = i + first_data_row
-                logger.debug(f"Date {target_date_str} found at 0-based row index {found_row_idx}")
-                return found_row_idx
-
-        logger.debug(f"Date {target_date_str} not found in worksheet")
+        found_row_idx, _, _ = _find_or_locate_insert(details, target_dt)
+        if found_row_idx is not None:
+            logger.debug("Date %s found at 0-based row index %s", target_date_str, found_row_idx)
+            return found_row_idx
+
+        logger.debug("Date %s not found in worksheet", target_date_str)
         return None
 
     except Exception as e:
@@ -63,66 +267,60 @@ def ensure_date_row(sheet_id: str, worksheet_name: str, target_dt: datetime.date
     details = _get_bot_sheet_details(bot_token)
     if not details:
         return None
-    worksheet, column_map, first_data_row, _, ws_name_from_details = details
-    # Use sheet_id and ws_name_from_details for consistency, although they might match input args
-    date_col_idx = column_map['DATE_COL_IDX']
+    return _ensure_date_row(details, target_dt)
+
+def _ensure_date_row(details: SheetDetails, target_dt: datetime.date) -> int | None:
+    """ensure_date_row for callers that already resolved the bot's SheetDetails."""
+    worksheet, first_data_row = details.worksheet, details.first_data_row
+    # Use the resolved sheet_id/worksheet_name for caching, although they might match input args
+    sheet_id_from_details, ws_name_from_details = details.sheet_id, details.worksheet_name
 
     try:
         target_date_str = format_date_for_sheet(target_dt)
 
-        # Try to find existing row using the bot_token
-        row_idx = find_row_by_date(sheet_id, ws_name_from_details, target_dt, bot_token)
+        # One read of the (usually cached) date column serves both the exact-match
+        # lookup and the insert position, so a new date costs no extra round trip.
+        row_idx, insert_position, num_date_rows = _find_or_locate_insert(details, target_dt)
         if row_idx is not None:
-            logger.debug(f"Found existing row {row_idx + 1} for date {target_date_str}")
+            logger.debug("Found existing row %s for date %s", row_idx + 1, target_date_str)
             return row_idx
 
-        # If not found, determine where to insert
-        last_row = worksheet.row_count
-        insert_position = first_data_row # Default: insert at the first data row position
-        found_insert_pos = False
-        
-        # Only fetch existing dates if there are data rows to check
-        if last_row >= first_data_row + 1:
-            # Get all dates to determine where to insert the new row
-            # +1 for indices because gspread uses 1-based indexing
-            date_range_a1 = f"{gspread.utils.rowcol_to_a1(first_data_row + 1, date_col_idx + 1)[0]}{first_data_row + 1}:{gspread.utils.rowcol_to_a1(last_row, date_col_idx + 1)[0]}{last_row}"
-            logger.debug(f"Fetching date column range for insertion check: {date_range_a1}")
-            date_values = worksheet.get(date_range_a1)
-
-            # Find the first date that is later than our target date
-            for i, row_list in enumerate(date_values):
-                current_row_index = first_data_row + i # 0-based index
-                if not row_list or not row_list[0]:
-                    continue
-                try:
-                    sheet_date_str = row_list[0]
-                    # Simple string comparison assuming 'Mmm dd' format works chronologically within a year
-                    # TODO: Improve date comparison robustness if跨年 dates or different formats exist
-                    if sheet_date_str > target_date_str:
-                        insert_position = current_row_index
-                        found_insert_pos = True
-                        break
-                except Exception as date_comp_err:
-                     logger.warning(f"Could not compare date '{row_list[0]}' with target '{target_date_str}' at row {current_row_index + 1}. Error: {date_comp_err}")
-                     continue
-            
-            if not found_insert_pos:
-                # If no later date was found, insert after the last valid data row examined
-                insert_position = first_data_row + len(date_values)
-        
         # Create a new row with the date, using None for other cells
-        num_columns = len(column_map) # Determine expected number of columns from map
-        new_row = [None] * num_columns
-        new_row[date_col_idx] = target_date_str
+        new_row = [None] * details.num_columns
+        new_row[details.date_col_idx] = target_date_str
 
         # Insert the row at the determined 0-based position (convert to 1-based for gspread)
         insert_index_1based = insert_position + 1
-        logger.debug(f"Inserting new row for date {target_date_str} at 1-based index {insert_index_1based}")
-        # Use insert_rows (plural) which takes a list of rows
-        worksheet.insert_rows([new_row], row=insert_index_1based, value_input_option='USER_ENTERED')
+        if insert_position == first_data_row + num_date_rows:
+            # Appending after the last date (the usual case for "today"): values.append with
+            # INSERT_ROWS is a single atomic server-side call and avoids shifting rows.
+            # The table is bounded to the date column, so the date lands there even when
+            # other columns (e.g. to its left) are empty or hold unrelated data.
+            logger.debug("Appending new row for date %s at 1-based index %s", target_date_str, insert_index_1based)
+            table_anchor = gspread.utils.rowcol_to_a1(first_data_row + 1, details.date_col_idx + 1)
+            response = _with_rate_limit_retry(
+                worksheet.append_row, [target_date_str],
+                value_input_option='USER_ENTERED',
+                insert_data_option='INSERT_ROWS',
+                table_range=f"{table_anchor}:{details.date_col_letter}"
+            )
+            # The API reports where the row actually landed; trust that over our snapshot,
+            # which can be behind if rows were added concurrently or by hand.
+            appended_row_idx = _appended_row_idx(response)
+            if appended_row_idx is not None and appended_row_idx != insert_position:
+                logger.warning(f"Row for date {target_date_str} was appended at 1-based index {appended_row_idx + 1}, expected {insert_index_1based}; refetching the date column next time")
+                invalidate_date_column_cache(sheet_id_from_details, ws_name_from_details)
+                return appended_row_idx
+        else:
+            logger.debug("Inserting new row for date %s at 1-based index %s", target_date_str, insert_index_1based)
+            # Use insert_rows (plural) which takes a list of rows
+            _with_rate_limit_retry(worksheet.insert_rows, [new_row], row=insert_index_1based, value_input_option='USER_ENTERED')
+        _record_inserted_date(sheet_id_from_details, ws_name_from_details, insert_position, first_data_row, target_dt)
 
         return insert_position # Return the 0-based index where inserted
 
     except Exception as e:
         logger.error(f"Error ensuring row for date {target_dt}: {e}", exc_info=True)
+        # The sheet may have changed underneath us; refetch the date column next time
+        invalidate_date_column_cache(sheet_id_from_details, ws_name_from_details)
         return None 
\ No newline at end of file
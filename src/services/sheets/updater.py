@@ -1,16 +1,216 @@
 """Functions for updating data in Google Sheets (metrics, nutrition)."""
 
 import logging
+import math
+import re
 from datetime import datetime
-from typing import Dict
+from typing import Any, Dict, List, Optional
 import gspread
 
 # Local imports
-from .utils import _get_bot_sheet_details, format_date_for_sheet # Import helper
-from .rows import ensure_date_row # Import row management
+from .client import _with_retry
+from .utils import _get_bot_sheet_details, format_date_for_sheet, _col_letter, SheetDetails # Import helpers
+from .rows import _ensure_date_row, _peek_cached_date_row, _snapshot_row_for, _store_date_column_snapshot # Import row management
 
 logger = logging.getLogger(__name__)
 
+# Plain decimal numbers, optionally signed or in exponent form, once thousands separators are removed
+_NUMERIC_TEXT_RE = re.compile(r'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?')
+
+def _cell_to_number(raw_value: Any, cell_a1: str) -> float:
+    """Converts a cell value read with UNFORMATTED_VALUE to a float.
+    Numbers come back as int/float and are used directly; only text (e.g. '1,234')
+    goes through string cleanup, validated up front rather than via a caught ValueError.
+    Blank or non-numeric cells count as 0.
+    """
+    if isinstance(raw_value, (int, float)):
+        return float(raw_value)
+    if raw_value is None:
+        return 0.0
+    cleaned_val_str = str(raw_value).replace(',', '').strip()
+    if not cleaned_val_str:
+        return 0.0
+    if _NUMERIC_TEXT_RE.fullmatch(cleaned_val_str):
+        return float(cleaned_val_str)
+    logger.warning(f"Non-numeric value '{raw_value}' in cell {cell_a1}. Treating as 0.")
+    return 0.0
+
+def _is_unchanged(existing_value: Any, new_value: Any) -> bool:
+    """Returns True if writing new_value (USER_ENTERED) over a cell read as existing_value
+    (UNFORMATTED_VALUE) would leave it as it is. Only clear-cut matches count; anything else is written.
+    """
+    if existing_value is None or existing_value == '':
+        return new_value is None or new_value == ''
+    if existing_value == new_value:
+        return True
+    if isinstance(existing_value, (int, float)) and isinstance(new_value, str):
+        # USER_ENTERED parses numeric text, so '80.5' over a stored 80.5 changes nothing
+        new_text = new_value.strip()
+        return bool(_NUMERIC_TEXT_RE.fullmatch(new_text)) and math.isclose(existing_value, float(new_text))
+    return False
+
+def _row_range_a1(row_num_1based: int, col_indices: List[int]) -> str:
+    """Returns the A1 range spanning col_indices on one row."""
+    return f"{_col_letter(min(col_indices))}{row_num_1based}:{_col_letter(max(col_indices))}{row_num_1based}"
+
+def _values_by_col(row_values: List, col_indices: List[int]) -> Dict[int, Any]:
+    """Maps a fetched row slice (starting at min(col_indices)) to {0-based column index: value}.
+    Missing keys mean an empty cell.
+    """
+    min_col = min(col_indices)
+    existing_by_col = {}
+    # Trailing empty cells are trimmed by the API, so indices past the end are simply empty
+    for col_idx_0based in col_indices:
+        fetch_index = col_idx_0based - min_col
+        if fetch_index < len(row_values):
+            existing_by_col[col_idx_0based] = row_values[fetch_index]
+    return existing_by_col
+
+def _fetch_existing_values(worksheet: gspread.Worksheet, row_num_1based: int, col_indices: List[int]) -> Optional[Dict[int, Any]]:
+    """Fetches the current values of col_indices on one row with a single range read.
+    Transient errors are retried inside _with_retry; returns None if the read still fails.
+    """
+    range_to_fetch_a1 = _row_range_a1(row_num_1based, col_indices)
+    logger.debug("Fetching existing values from range: %s", range_to_fetch_a1)
+    try:
+        existing_values_list = _with_retry(worksheet.get, range_to_fetch_a1, value_render_option='UNFORMATTED_VALUE')
+    except Exception as e:
+        # Don't guess at the current values (writing would clobber them) or fan out to per-cell reads
+        logger.error(f"Error fetching existing values from range {range_to_fetch_a1}: {e}")
+        return None
+    existing_row_values = existing_values_list[0] if existing_values_list else []
+    logger.debug("Existing values fetched: %s", existing_row_values)
+    return _values_by_col(existing_row_values, col_indices)
+
+def _fetch_date_column_and_row(details: SheetDetails, target_dt: datetime.date, hint_row: int, col_indices: List[int]) -> Optional[Dict[int, Any]]:
+    """Refreshes the date column and reads the hinted row's values in one values.batchGet.
+    Returns the row's values if the fresh date column still places target_dt at hint_row,
+    otherwise None (the caller then falls back to ensure_date_row and a separate read).
+    """
+    date_range_a1 = details.date_col_range
+    row_range_a1 = _row_range_a1(hint_row + 1, col_indices)
+    logger.debug("Fetching date column %s and nutrition range %s together", date_range_a1, row_range_a1)
+    try:
+        # Numbers stay numeric, while date cells keep their displayed text ('Jul 16')
+        date_values, row_values = _with_retry(
+            details.worksheet.batch_get, [date_range_a1, row_range_a1],
+            value_render_option='UNFORMATTED_VALUE',
+            date_time_render_option='FORMATTED_STRING'
+        )
+    except Exception as e:
+        logger.warning(f"Combined date/nutrition fetch failed ({e}); falling back to separate reads.")
+        return None
+
+    snapshot = _store_date_column_snapshot(details, date_values)
+    if _snapshot_row_for(snapshot, target_dt) != hint_row:
+        logger.debug("Date %s moved since the last snapshot; falling back to ensure_date_row", target_dt)
+        return None
+    return _values_by_col(row_values[0] if row_values else [], col_indices)
+
+def _coalesce_row_updates(row_num_1based: int, new_values: Dict[int, Any], col_letters: Dict[int, str]) -> List[Dict[str, Any]]:
+    """Builds batch_update entries for one row, merging adjacent columns into a single range.
+    e.g. {1: p, 2: c, 3: f, 5: w} -> [{'range': 'B6:D6', 'values': [[p, c, f]]}, {'range': 'F6', 'values': [[w]]}]
+    """
+    updates = []
+    run_cols: List[int] = []
+    for col_idx_0based in sorted(new_values):
+        if run_cols and col_idx_0based != run_cols[-1] + 1:
+            updates.append(_row_run_update(row_num_1based, run_cols, new_values, col_letters))
+            run_cols = []
+        run_cols.append(col_idx_0based)
+    updates.append(_row_run_update(row_num_1based, run_cols, new_values, col_letters))
+    return updates
+
+def _row_run_update(row_num_1based: int, run_cols: List[int], new_values: Dict[int, Any], col_letters: Dict[int, str]) -> Dict[str, Any]:
+    """Builds one batch_update entry for a run of adjacent columns on one row."""
+    range_a1 = f"{col_letters[run_cols[0]]}{row_num_1based}"
+    if len(run_cols) > 1:
+        range_a1 += f":{col_letters[run_cols[-1]]}{row_num_1based}"
+    return {'range': range_a1, 'values': [[new_values[col] for col in run_cols]]}
+
+def _apply_row_updates(details: SheetDetails, target_dt: datetime.date, increments: Dict[int, float], sets: Dict[int, Any]) -> Optional[int]:
+    """Resolves the date row once, reads the current values of the increment columns,
+    and writes every change (increments and plain sets) in a single batch_update.
+    Cells that would keep their current value are skipped whenever that value is known.
+    Columns not in the bot's column map are skipped. A column given in both dicts is incremented.
+    Returns the number of cells written, or None on failure.
+    """
+    worksheet, valid_col_indices = details.worksheet, details.valid_col_indices
+    target_date_str = format_date_for_sheet(target_dt)
+
+    for col_idx_0based in [col for col in (*increments, *sets) if col not in valid_col_indices]:
+        # Validate that the column index is actually expected by the config
+        logger.warning(f"Attempted to update unexpected column index {col_idx_0based}. Skipping.")
+    increments = {col: value for col, value in increments.items() if col in valid_col_indices}
+    sets = {col: value for col, value in sets.items() if col in valid_col_indices and col not in increments}
+    if not increments and not sets:
+        return 0
+
+    increment_cols = list(increments)
+    # Every touched column is read along with the row, so unchanged overwrites can be dropped.
+    # Increments always need that read; plain sets only use it when it costs no extra request.
+    read_cols = increment_cols + list(sets)
+    row_index_0based, existing_by_col = None, None # existing_by_col stays None if the row wasn't read
+
+    # If an expired date snapshot still knows the row, the date column has to be re-read anyway:
+    # re-validate the row and read its existing values in that same round trip.
+    hint_row, snapshot_fresh = _peek_cached_date_row(details, target_dt)
+    if hint_row is not None and not snapshot_fresh:
+        existing_by_col = _fetch_date_column_and_row(details, target_dt, hint_row, read_cols)
+        if existing_by_col is not None:
+            row_index_0based = hint_row
+
+    if row_index_0based is None:
+        # Ensure the row exists
+        row_index_0based = _ensure_date_row(details, target_dt)
+        if row_index_0based is None:
+            logger.error(f"Could not find/create row for {target_date_str} in {details.sheet_id}/{details.worksheet_name}.")
+            return None
+        if increment_cols:
+            existing_by_col = _fetch_existing_values(worksheet, row_index_0based + 1, read_cols)
+            if existing_by_col is None:
+                return None
+
+    row_num_1based = row_index_0based + 1
+    col_letters = details.col_letters # Only mapped columns remain at this point
+    new_values: Dict[int, Any] = {} # 0-based column index -> value to write
+
+    for col_idx_0based, value in sets.items():
+        if existing_by_col is not None and _is_unchanged(existing_by_col.get(col_idx_0based), value):
+            logger.debug("Skipping unchanged cell %s%s (value %s)", col_letters[col_idx_0based], row_num_1based, value)
+            continue
+        new_values[col_idx_0based] = value
+        logger.debug("Preparing update for cell %s%s in %s with value: %s", col_letters[col_idx_0based], row_num_1based, worksheet.title, value)
+
+    for col_idx_0based, value_to_add in increments.items():
+        cell_a1 = f"{col_letters[col_idx_0based]}{row_num_1based}"
+
+        try:
+            existing_val = _cell_to_number(existing_by_col.get(col_idx_0based), cell_a1)
+
+            new_value = existing_val + value_to_add
+            if math.isclose(new_value, existing_val):
+                # Delta too small to change the stored value; don't rewrite the cell
+                logger.debug("Skipping unchanged cell %s (value %s)", cell_a1, existing_val)
+                continue
+            new_values[col_idx_0based] = new_value
+            logger.debug("Preparing update for cell %s: %s + %s = %s", cell_a1, existing_val, value_to_add, new_value)
+
+        except Exception as e:
+            logger.error(f"Error processing cell {cell_a1} for row update: {e}")
+            return None # Stop if a critical error occurs processing a cell
+
+    if not new_values:
+        return 0
+
+    updates = _coalesce_row_updates(row_num_1based, new_values, col_letters) # For batch update
+    try:
+        _with_retry(worksheet.batch_update, updates, value_input_option='USER_ENTERED')
+    except Exception as e:
+        logger.error(f"Error batch updating {len(new_values)} cell(s) for {target_date_str} in {worksheet.title}: {e}", exc_info=True)
+        return None
+    return len(new_values)
+
 def update_metrics(sheet_id: str, worksheet_name: str, target_dt: datetime.date, metric_updates: Dict[int, any], bot_token: str) -> bool:
     """Updates one or more metric cells for a given date.
     Args:
@@ -32,42 +232,15 @@ def update_metrics(sheet_id: str, worksheet_name: str, target_dt: datetime.date,
     if not details:
         logger.error(f"Could not get sheet details for bot {bot_token[:6]}... in update_metrics")
         return False
-    worksheet, column_map, _, _, _ = details
 
-    # Ensure the row exists for the target date
-    row_index_0based = ensure_date_row(sheet_id, worksheet_name, target_dt, bot_token)
-    if row_index_0based is None:
-        logger.error(f"Could not find/create row for {format_date_for_sheet(target_dt)} in {sheet_id}/{worksheet_name} to update metrics.")
+    written = _apply_row_updates(details, target_dt, {}, metric_updates)
+    if written is None:
         return False
-
-    updates_for_batch = []
-    row_num_1based = row_index_0based + 1
-
-    for col_idx_0based, value in metric_updates.items():
-        # Validate that the column index is actually expected by the config
-        if col_idx_0based not in column_map.values():
-            logger.warning(f"Attempted to update unexpected column index {col_idx_0based}. Skipping.")
-            continue
-            
-        col_num_1based = col_idx_0based + 1
-        cell_a1 = gspread.utils.rowcol_to_a1(row_num_1based, col_num_1based)
-        updates_for_batch.append({
-            'range': cell_a1,
-            'values': [[value]],
-        })
-        logger.debug(f"Preparing update for cell {cell_a1} in {worksheet.title} with value: {value}")
-
-    if updates_for_batch:
-        try:
-            worksheet.batch_update(updates_for_batch, value_input_option='USER_ENTERED')
-            logger.info(f"Successfully updated {len(updates_for_batch)} metric(s) for {format_date_for_sheet(target_dt)} in {worksheet.title}.")
-            return True
-        except Exception as e:
-            logger.error(f"Error batch updating metrics for {format_date_for_sheet(target_dt)} in {worksheet.title}: {e}", exc_info=True)
-            return False
+    if written:
+        logger.info(f"Successfully updated {written} metric(s) for {format_date_for_sheet(target_dt)} in {details.worksheet.title}.")
     else:
-        logger.info(f"No valid metric updates prepared for {format_date_for_sheet(target_dt)} in {worksheet.title}.")
-        return True
+        logger.info(f"No metric changes to write for {format_date_for_sheet(target_dt)} in {details.worksheet.title} (values unchanged or columns not mapped).")
+    return True
 
 def add_nutrition(sheet_id: str, worksheet_name: str, target_dt: datetime.date, bot_token: str, calories: float = 0, p: float = 0, c: float = 0, f: float = 0, fi: float = 0) -> bool:
     """Adds nutritional values (P, C, F, Fi) to the existing values in the sheet.
@@ -86,123 +259,41 @@ def add_nutrition(sheet_id: str, worksheet_name: str, target_dt: datetime.date,
     Returns:
         True if successful, False otherwise.
     """
+    # Only proceed (and touch the sheet at all) if there are actual P, C, F, or Fi values to add.
+    # Checked before resolving sheet details, which can cost network calls on a cold cache.
+    if not any((p, c, f, fi)): # None and 0 both count as nothing to add
+        logger.info(f"No non-zero P, C, F, or Fi values to add for {format_date_for_sheet(target_dt)}.")
+        if calories > 0:
+             logger.info(f"Note: Meal had calculated calories ({calories:.0f}), but only P/C/F/Fi are written to the sheet.")
+        return True
+
     # Get worksheet and config using the helper
     details = _get_bot_sheet_details(bot_token)
     if not details:
         logger.error(f"Could not get sheet details for bot {bot_token[:6]}... in add_nutrition")
         return False
-    worksheet, column_map, _, _, _ = details
 
-    # Resolve nutrition indices dynamically
-    protein_idx = column_map.get('PROTEIN_COL_IDX')
-    carbs_idx = column_map.get('CARBS_COL_IDX')
-    fat_idx = column_map.get('FAT_COL_IDX')
-    fiber_idx = column_map.get('FIBER_COL_IDX')
+    # Nutrition indices are resolved once per bot schema
+    protein_idx, carbs_idx, fat_idx, fiber_idx = details.protein_idx, details.carbs_idx, details.fat_idx, details.fiber_idx
 
     if None in [protein_idx, carbs_idx, fat_idx, fiber_idx]:
         logger.error(f"Schema Error: One or more nutrition columns not found in map for bot {bot_token[:6]}...")
         return False
 
-    # Ensure the row exists
-    row_index_0based = ensure_date_row(sheet_id, worksheet_name, target_dt, bot_token)
-    if row_index_0based is None:
-        logger.error(f"Could not find or create row for date {format_date_for_sheet(target_dt)} to add nutrition")
-        return False
-
-    row_num_1based = row_index_0based + 1
-
-    # Define columns to update using RESOLVED indices
+    # Define columns to update using RESOLVED indices, keeping only non-zero deltas
     cols_to_update = {
-        protein_idx: p,
-        carbs_idx: c,
-        fat_idx: f,
-        fiber_idx: fi
+        col_idx: value
+        for col_idx, value in ((protein_idx, p), (carbs_idx, c), (fat_idx, f), (fiber_idx, fi))
+        if value # Skips None and 0
     }
-    updates = [] # For batch update
 
-    # Only proceed if there are actual P, C, F, or Fi values to add
-    values_to_add = [v for v in cols_to_update.values() if v is not None and v != 0]
-    if not values_to_add:
-        logger.info(f"No non-zero P, C, F, or Fi values to add for {format_date_for_sheet(target_dt)}.")
+    written = _apply_row_updates(details, target_dt, cols_to_update, {})
+    if written is None:
+        return False
+    if written:
+        logger.info(f"Successfully added P/C/F/Fi for {format_date_for_sheet(target_dt)}. {written} cells updated.")
         if calories > 0:
-             logger.info(f"Note: Meal had calculated calories ({calories:.0f}), but only P/C/F/Fi are written to the sheet.")
-        return True
-
-    # Determine the range to fetch (Protein to Fiber)
-    valid_indices = [idx for idx, val in cols_to_update.items() if val is not None and val != 0]
-    if not valid_indices:
-        # Should not happen due to the check above, but as a safeguard
-        return True 
-        
-    min_col = min(valid_indices)
-    max_col = max(valid_indices)
-
-    # Fetch existing values in one go
-    range_to_fetch_a1 = f"{gspread.utils.rowcol_to_a1(row_num_1based, min_col + 1)[0]}{row_num_1based}:{gspread.utils.rowcol_to_a1(row_num_1based, max_col + 1)[0]}{row_num_1based}"
-    logger.debug(f"Fetching existing nutrition values from range: {range_to_fetch_a1}")
-
-    try:
-        existing_values_list = worksheet.get(range_to_fetch_a1, value_render_option='UNFORMATTED_VALUE')
-        existing_row_values = existing_values_list[0] if existing_values_list else []
-        logger.debug(f"Existing values fetched: {existing_row_values}")
-    except Exception as e:
-        logger.error(f"Error fetching existing nutrition values from range {range_to_fetch_a1}: {e}. Proceeding cell-by-cell.")
-        existing_row_values = None # Flag to fetch individually
-
-    for col_idx_0based, value_to_add in cols_to_update.items():
-        if value_to_add is None or value_to_add == 0:
-             continue
-
-        col_num_1based = col_idx_0based + 1
-        cell_a1 = gspread.utils.rowcol_to_a1(row_num_1based, col_num_1based)
-        existing_val = 0.0
-
-        try:
-            if existing_row_values is not None:
-                # Calculate index within the fetched list (relative to min_col)
-                fetch_index = col_idx_0based - min_col
-                if 0 <= fetch_index < len(existing_row_values):
-                    existing_val_str = str(existing_row_values[fetch_index])
-                else:
-                    # This case means the column is outside the fetched range, but we need to update it.
-                    # Fetch individually. This might happen if columns aren't contiguous.                    
-                    logger.warning(f"Index {fetch_index} out of bounds for fetched range {range_to_fetch_a1}. Fetching cell {cell_a1} individually.")
-                    existing_val_str = str(worksheet.cell(row_num_1based, col_num_1based).value)
-            else:
-                # Fallback: Fetch cell individually if range fetch failed or was skipped
-                existing_val_str = str(worksheet.cell(row_num_1based, col_num_1based).value)
-
-            if existing_val_str and existing_val_str.strip() and existing_val_str.lower() != 'none':
-                # Remove commas, handle potential non-numeric values gracefully
-                cleaned_val_str = existing_val_str.replace(',', '').strip()
-                try:
-                    existing_val = float(cleaned_val_str)
-                except ValueError:
-                    logger.warning(f"Non-numeric value '{existing_val_str}' in cell {cell_a1}. Treating as 0.")
-                    existing_val = 0.0
-
-            new_value = existing_val + value_to_add
-            # Prepare for batch update
-            updates.append({
-                'range': cell_a1,
-                'values': [[new_value]],
-            })
-            logger.debug(f"Preparing update for cell {cell_a1}: {existing_val} + {value_to_add} = {new_value}")
-
-        except Exception as e:
-            logger.error(f"Error processing cell {cell_a1} for nutrition update: {e}")
-            return False # Stop if a critical error occurs processing a cell
-
-    if updates:
-        try:
-            worksheet.batch_update(updates, value_input_option='USER_ENTERED')
-            logger.info(f"Successfully added P/C/F/Fi for {format_date_for_sheet(target_dt)}. {len(updates)} cells updated.")
-            if calories > 0:
-                logger.info(f"Note: Meal contributed calculated {calories:.0f} calories (based on API lookup). Check sheet formula for final value.")
-            return True
-        except Exception as e:
-            logger.error(f"Error during batch update for nutrition: {e}")
-            return False
+            logger.info(f"Note: Meal contributed calculated {calories:.0f} calories (based on API lookup). Check sheet formula for final value.")
     else:
         logger.info(f"No valid non-zero P, C, F, or Fi values were prepared for {format_date_for_sheet(target_dt)}.")
-        return True 
\ No newline at end of file
+    return True
@@ -1,8 +1,10 @@
 """Utility functions for Google Sheets interactions."""
 
 import logging
+import threading
 from datetime import datetime
-from typing import Optional, Tuple, Dict
+from functools import lru_cache
+from typing import Optional, Dict, NamedTuple
 import gspread
 
 # Project imports
@@ -13,41 +15,112 @@ from .client import _get_worksheet
 
 logger = logging.getLogger(__name__)
 
+class SheetDetails(NamedTuple):
+    """Resolved worksheet handle and layout for one bot, plus values derived from the layout once."""
+    worksheet: Optional[gspread.Worksheet] # None in the memoized per-bot layout
+    column_map: Dict[str, int]
+    first_data_row: int
+    sheet_id: str
+    worksheet_name: str
+    date_col_letter: str # A1 column letter(s) of DATE_COL_IDX
+    num_columns: int # Row width needed to cover every mapped column
+    valid_col_indices: frozenset # All mapped 0-based column indices, for O(1) membership checks
+    date_col_idx: int
+    protein_idx: Optional[int]
+    carbs_idx: Optional[int]
+    fat_idx: Optional[int]
+    fiber_idx: Optional[int]
+    col_letters: Dict[int, str] # 0-based column index -> A1 column letter(s), for every mapped column
+    date_col_range: str # Open-ended A1 range of the date column's data rows, e.g. 'A2:A'
+
+# --- Bot Schema Cache ---
+# Bot configs don't change at runtime, so each bot's validated layout is resolved once and kept.
+# Entries carry no worksheet; the handle comes from the client's worksheet cache on every lookup.
+_bot_schema_cache: Dict[str, SheetDetails] = {}
+_bot_schema_cache_lock = threading.Lock()
 
 def format_date_for_sheet(dt_obj: datetime.date) -> str:
     """Formats a date object into the string format used in the sheet (e.g., 'Jul 16')."""
     return dt_obj.strftime('%b %-d')
 
-def _get_bot_sheet_details(bot_token: str) -> Optional[Tuple[gspread.Worksheet, Dict, int, str, str]]:
+@lru_cache(maxsize=None)
+def _col_letter(col_idx: int) -> str:
+    """Returns the A1 column letter(s) for a 0-based column index (0 -> 'A', 26 -> 'AA')."""
+    return gspread.utils.rowcol_to_a1(1, col_idx + 1)[:-1]
+
+def _build_sheet_details(worksheet: Optional[gspread.Worksheet], column_map: Dict[str, int], first_data_row: int, sheet_id: str, worksheet_name: str) -> SheetDetails:
+    """Builds SheetDetails, precomputing the layout-derived fields."""
+    date_col_letter = _col_letter(column_map['DATE_COL_IDX'])
+    return SheetDetails(
+        worksheet, column_map, first_data_row, sheet_id, worksheet_name,
+        date_col_letter=date_col_letter,
+        num_columns=max(column_map.values()) + 1, # Maps can be sparse, so len() may be too short
+        valid_col_indices=frozenset(column_map.values()),
+        date_col_idx=column_map['DATE_COL_IDX'],
+        protein_idx=column_map.get('PROTEIN_COL_IDX'),
+        carbs_idx=column_map.get('CARBS_COL_IDX'),
+        fat_idx=column_map.get('FAT_COL_IDX'),
+        fiber_idx=column_map.get('FIBER_COL_IDX'),
+        col_letters={col_idx: _col_letter(col_idx) for col_idx in column_map.values()},
+        # +1 because gspread uses 1-based rows. Open-ended so the API trims it to the last
+        # non-empty row; cached Worksheet handles don't update row_count after writes.
+        date_col_range=f"{date_col_letter}{first_data_row + 1}:{date_col_letter}",
+    )
+
+def _resolve_bot_schema(bot_token: str) -> Optional[SheetDetails]:
+    """Looks up and validates a bot's sheet config once, memoizing the result per bot_token.
+    Returns None if the config is missing or invalid (failures are not cached).
+    """
+    # Check cache first (without lock for performance)
+    schema = _bot_schema_cache.get(bot_token)
+    if schema is not None:
+        return schema
+
+    with _bot_schema_cache_lock:
+        # Double-check lock
+        schema = _bot_schema_cache.get(bot_token)
+        if schema is not None:
+            return schema
+
+        config = get_config()
+        bot_config = config.get_bot_config_by_token(bot_token)
+        if not bot_config:
+            logger.error(f"Could not find config for bot {bot_token[:6]}... in _get_bot_sheet_details")
+            return None
+
+        sheet_id = bot_config.get('google_sheet_id')
+        worksheet_name = bot_config.get('worksheet_name')
+        column_map = bot_config.get('column_map')
+        first_data_row = bot_config.get('first_data_row')
+
+        if not all([sheet_id, worksheet_name, column_map is not None, first_data_row is not None]):
+            logger.error(f"Incomplete configuration for bot {bot_token[:6]}... Missing sheet_id, worksheet_name, column_map, or first_data_row.")
+            return None
+            
+        # Validate essential column indices exist
+        if 'DATE_COL_IDX' not in column_map:
+             logger.error(f"Schema Error: DATE_COL_IDX not found in map for bot {bot_token[:6]}...")
+             return None
+
+        schema = _build_sheet_details(None, column_map, first_data_row, sheet_id, worksheet_name)
+        _bot_schema_cache[bot_token] = schema
+        return schema
+
+def _get_bot_sheet_details(bot_token: str) -> Optional[SheetDetails]:
     """Fetches bot config and retrieves worksheet, column map, first data row, sheet ID, and worksheet name.
+    The validated config is memoized per bot_token; the worksheet comes from the client's cache.
     
     Returns:
-        A tuple (worksheet, column_map, first_data_row, sheet_id, worksheet_name) if successful.
+        A SheetDetails tuple (worksheet, column_map, first_data_row, sheet_id, worksheet_name, ...) if successful.
         None if config is missing, invalid, or worksheet cannot be accessed.
     """
-    config = get_config()
-    bot_config = config.get_bot_config_by_token(bot_token)
-    if not bot_config:
-        logger.error(f"Could not find config for bot {bot_token[:6]}... in _get_bot_sheet_details")
-        return None
-
-    sheet_id = bot_config.get('google_sheet_id')
-    worksheet_name = bot_config.get('worksheet_name')
-    column_map = bot_config.get('column_map')
-    first_data_row = bot_config.get('first_data_row')
-
-    if not all([sheet_id, worksheet_name, column_map is not None, first_data_row is not None]):
-        logger.error(f"Incomplete configuration for bot {bot_token[:6]}... Missing sheet_id, worksheet_name, column_map, or first_data_row.")
+    schema = _resolve_bot_schema(bot_token)
+    if schema is None:
         return None
-        
-    # Validate essential column indices exist
-    if 'DATE_COL_IDX' not in column_map:
-         logger.error(f"Schema Error: DATE_COL_IDX not found in map for bot {bot_token[:6]}...")
-         return None
 
-    worksheet = _get_worksheet(sheet_id, worksheet_name)
+    worksheet = _get_worksheet(schema.sheet_id, schema.worksheet_name)
     if not worksheet:
-        logger.error(f"Failed to get worksheet '{worksheet_name}' for bot {bot_token[:6]}...")
+        logger.error(f"Failed to get worksheet '{schema.worksheet_name}' for bot {bot_token[:6]}...")
         return None
 
-    return worksheet, column_map, first_data_row, sheet_id, worksheet_name 
\ No newline at end of file
+    return schema._replace(worksheet=worksheet)
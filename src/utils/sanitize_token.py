@@ -1,9 +1,21 @@
+import re
 from typing import Optional
 
+# ASCII control characters (everything below space, plus DEL)
+_NON_PRINTABLE_ASCII = bytes(range(32)) + b'\x7f'
+
+# A leading ``` or ```json line and a trailing ``` line, as Gemini wraps JSON answers
+_CODE_FENCE_RE = re.compile(r'^\s*```(?:json)?\s*|\s*```\s*$', re.IGNORECASE)
+
 def sanitize_token(token: Optional[str]) -> Optional[str]:
     """Sanitize the token by removing whitespace and non-printable characters."""
     if token:
         # Keep only printable ASCII characters for typical tokens
         # (Ensure this logic matches token requirements)
-        return ''.join(c for c in token if 32 <= ord(c) <= 126) 
-    return None
\ No newline at end of file
+        # Dropping non-ASCII on encode and control bytes via translate keeps the loop in C.
+        return token.encode('ascii', 'ignore').translate(None, _NON_PRINTABLE_ASCII).decode('ascii')
+    return None
+
+def strip_code_fence(text: str) -> str:
+    """Remove a surrounding markdown code fence from a model response, if present."""
+    return _CODE_FENCE_RE.sub('', text).strip()
@@ -1,19 +1,52 @@
 import unittest
-from unittest.mock import patch, AsyncMock
-from datetime import date, timedelta
+from unittest.mock import patch, MagicMock
+from datetime import date
+from types import MappingProxyType
+from telegram import Update, Message, Bot, Chat
 
 # Module to test
 from src.bot.commands import summary
 
+# Sheet configs returned by the patched _get_current_sheet_config (read-only, shared by tests)
+_MINIMAL_CONFIG = MappingProxyType({'google_sheet_id': 'sid', 'worksheet_name': 'wsn', 'column_map': {'DATE_COL_IDX': 0}})
+_DAILY_CONFIG = MappingProxyType({
+    'google_sheet_id': 'sid',
+    'worksheet_name': 'wsn',
+    'column_map': {
+        'DATE_COL_IDX': 0, 'CALORIES_COL_IDX': 1, 'PROTEIN_COL_IDX': 2,
+        'CARBS_COL_IDX': 3, 'FAT_COL_IDX': 4, 'FIBER_COL_IDX': 5,
+        'STEPS_COL_IDX': 6
+    }
+})
+_WEEKLY_CONFIG = MappingProxyType({
+    'google_sheet_id': 'sid',
+    'worksheet_name': 'wsn',
+    'column_map': {
+        'DATE_COL_IDX': 0, 'SLEEP_HOURS_COL_IDX': 1, 'WEIGHT_COL_IDX': 2,
+        'STEPS_COL_IDX': 3, 'CALORIES_COL_IDX': 4
+    }
+})
+
 class TestSummaryCommands(unittest.IsolatedAsyncioTestCase):
 
+    def setUp(self):
+        # Every test stubs the sheet config lookup and the data fetch
+        config_patcher = patch('src.bot.commands.summary._get_current_sheet_config')
+        fetch_patcher = patch('src.bot.commands.summary._fetch_and_process_summary_data')
+        self.mock_get_config = config_patcher.start()
+        self.mock_fetch_data = fetch_patcher.start()
+        self.addCleanup(config_patcher.stop)
+        self.addCleanup(fetch_patcher.stop)
+
     # Helper to create mock Update and Context
     def _create_mocks(self, bot_token="dummy:token"):
-        mock_update = AsyncMock()
-        mock_context = AsyncMock()
-        mock_message = AsyncMock()
-        mock_chat = AsyncMock()
-        mock_bot = AsyncMock()
+        # Specced MagicMocks: a mistyped attribute fails fast, and coroutine methods
+        # (reply_text, reply_html, ...) become AsyncMocks automatically
+        mock_update = MagicMock(spec=Update)
+        mock_context = MagicMock()
+        mock_message = MagicMock(spec=Message)
+        mock_chat = MagicMock(spec=Chat)
+        mock_bot = MagicMock(spec=Bot)
 
         mock_update.effective_chat = mock_chat
         mock_update.message = mock_message
@@ -25,28 +58,17 @@ class TestSummaryCommands(unittest.IsolatedAsyncioTestCase):
 
         return mock_update, mock_context, mock_bot
 
-    @patch('src.bot.commands.summary._fetch_and_process_summary_data')
-    @patch('src.bot.commands.summary._get_current_sheet_config')
-    async def test_daily_summary_success(self, mock_get_config, mock_fetch_data):
+    async def test_daily_summary_success(self):
         """Test daily summary command with successful data fetch."""
         mock_update, mock_context, mock_bot = self._create_mocks()
-        mock_config_data = {
-            'google_sheet_id': 'sid', 
-            'worksheet_name': 'wsn', 
-            'column_map': {
-                'DATE_COL_IDX': 0, 'CALORIES_COL_IDX': 1, 'PROTEIN_COL_IDX': 2,
-                'CARBS_COL_IDX': 3, 'FAT_COL_IDX': 4, 'FIBER_COL_IDX': 5,
-                'STEPS_COL_IDX': 6
-            }
-        }
-        mock_get_config.return_value = mock_config_data
+        self.mock_get_config.return_value = _DAILY_CONFIG
         # Mock fetched data (values correspond to the order in column_keys_to_fetch)
-        mock_fetch_data.return_value = [['2150', '155.5', '200', '60.1', '35', '10500']] 
+        self.mock_fetch_data.return_value = [['2150', '155.5', '200', '60.1', '35', '10500']] 
         
         await summary.daily_summary_command(mock_update, mock_context)
 
-        mock_get_config.assert_called_once_with(mock_update)
-        mock_fetch_data.assert_called_once()
+        self.mock_get_config.assert_called_once_with(mock_update)
+        self.mock_fetch_data.assert_called_once()
         mock_update.message.reply_html.assert_called_once()
         reply_text = mock_update.message.reply_html.call_args[0][0]
 
@@ -58,30 +80,31 @@ class TestSummaryCommands(unittest.IsolatedAsyncioTestCase):
         self.assertIn("Fiber: <b>35g</b>", reply_text)
         self.assertIn("Steps: <b>10500</b>", reply_text)
 
-    @patch('src.bot.commands.summary._fetch_and_process_summary_data')
-    @patch('src.bot.commands.summary._get_current_sheet_config')
-    async def test_daily_summary_no_data(self, mock_get_config, mock_fetch_data):
-        """Test daily summary command when no data is found for today."""
-        mock_update, mock_context, mock_bot = self._create_mocks()
-        mock_config_data = {'google_sheet_id': 'sid', 'worksheet_name': 'wsn', 'column_map': {'DATE_COL_IDX': 0}}
-        mock_get_config.return_value = mock_config_data
-        mock_fetch_data.return_value = [] # Simulate no data found
-        
-        await summary.daily_summary_command(mock_update, mock_context)
+    async def test_summary_no_data(self):
+        """Test daily and weekly summaries when no data is found for their period."""
+        cases = [
+            (summary.daily_summary_command, "No data found for today"),
+            (summary.weekly_summary_command, "No data found for the period"),
+        ]
+        self.mock_get_config.return_value = _MINIMAL_CONFIG
+        self.mock_fetch_data.return_value = [] # Simulate no data found
 
-        mock_update.message.reply_html.assert_called_once()
-        reply_text = mock_update.message.reply_html.call_args[0][0]
-        self.assertIn("No data found for today", reply_text)
+        for command, expected in cases:
+            with self.subTest(command=command.__name__):
+                mock_update, mock_context, mock_bot = self._create_mocks()
+
+                await command(mock_update, mock_context)
+
+                mock_update.message.reply_html.assert_called_once()
+                reply_text = mock_update.message.reply_html.call_args[0][0]
+                self.assertIn(expected, reply_text)
 
     @patch('src.bot.commands.summary.send_error_message') # Mock error sender
-    @patch('src.bot.commands.summary._fetch_and_process_summary_data')
-    @patch('src.bot.commands.summary._get_current_sheet_config')
-    async def test_daily_summary_fetch_error(self, mock_get_config, mock_fetch_data, mock_send_error):
+    async def test_daily_summary_fetch_error(self, mock_send_error):
         """Test daily summary command when data fetch returns None."""
         mock_update, mock_context, mock_bot = self._create_mocks()
-        mock_config_data = {'google_sheet_id': 'sid', 'worksheet_name': 'wsn', 'column_map': {'DATE_COL_IDX': 0}}
-        mock_get_config.return_value = mock_config_data
-        mock_fetch_data.return_value = None # Simulate fetch error
+        self.mock_get_config.return_value = _MINIMAL_CONFIG
+        self.mock_fetch_data.return_value = None # Simulate fetch error
         
         await summary.daily_summary_command(mock_update, mock_context)
 
@@ -97,22 +120,12 @@ class TestSummaryCommands(unittest.IsolatedAsyncioTestCase):
         self.assertTrue(True) # Pass if no error occurs and no reply is sent
         
 
-    @patch('src.bot.commands.summary._fetch_and_process_summary_data')
-    @patch('src.bot.commands.summary._get_current_sheet_config')
-    async def test_weekly_summary_success(self, mock_get_config, mock_fetch_data):
+    async def test_weekly_summary_success(self):
         """Test weekly summary command with successful data fetch."""
         mock_update, mock_context, mock_bot = self._create_mocks()
-        mock_config_data = {
-            'google_sheet_id': 'sid', 
-            'worksheet_name': 'wsn', 
-            'column_map': {
-                'DATE_COL_IDX': 0, 'SLEEP_HOURS_COL_IDX': 1, 'WEIGHT_COL_IDX': 2,
-                'STEPS_COL_IDX': 3, 'CALORIES_COL_IDX': 4
-            }
-        }
-        mock_get_config.return_value = mock_config_data
+        self.mock_get_config.return_value = _WEEKLY_CONFIG
         # Mock data for multiple days (values correspond to SLEEP, WEIGHT, STEPS, CALORIES)
-        mock_fetch_data.return_value = [
+        self.mock_fetch_data.return_value = [
             [7.5, 85.0, 10000, 2200], # Day 1
             [8.0, None, 12000, 2300], # Day 2 (missing weight)
             [7.0, 84.5, 8000, '2100']  # Day 3 (calories as string)
@@ -120,8 +133,8 @@ class TestSummaryCommands(unittest.IsolatedAsyncioTestCase):
         
         await summary.weekly_summary_command(mock_update, mock_context)
 
-        mock_get_config.assert_called_once_with(mock_update)
-        mock_fetch_data.assert_called_once()
+        self.mock_get_config.assert_called_once_with(mock_update)
+        self.mock_fetch_data.assert_called_once()
         mock_update.message.reply_html.assert_called_once()
         reply_text = mock_update.message.reply_html.call_args[0][0]
         
@@ -137,20 +150,56 @@ class TestSummaryCommands(unittest.IsolatedAsyncioTestCase):
         self.assertIn(f"Avg Steps: {avg_steps:.0f}", reply_text)
         self.assertIn(f"Avg Calories: {avg_calories:.0f}", reply_text)
 
-    @patch('src.bot.commands.summary._fetch_and_process_summary_data')
-    @patch('src.bot.commands.summary._get_current_sheet_config')
-    async def test_weekly_summary_no_data(self, mock_get_config, mock_fetch_data):
-        """Test weekly summary command when no data is found for the week."""
-        mock_update, mock_context, mock_bot = self._create_mocks()
-        mock_config_data = {'google_sheet_id': 'sid', 'worksheet_name': 'wsn', 'column_map': {'DATE_COL_IDX': 0}}
-        mock_get_config.return_value = mock_config_data
-        mock_fetch_data.return_value = [] # Simulate no data
+@patch('src.bot.commands.summary.read_date_rows_async')
+class TestFetchAndProcessSummaryData(unittest.IsolatedAsyncioTestCase):
 
-        await summary.weekly_summary_command(mock_update, mock_context)
+    async def _fetch(self, start_dt, end_dt):
+        """Runs the helper for sleep and weight from _WEEKLY_CONFIG (columns 1-2)."""
+        return await summary._fetch_and_process_summary_data(
+            MagicMock(spec=Update), MagicMock(), 'sid', 'wsn', 'dummy:token',
+            start_dt, end_dt, ['SLEEP_HOURS_COL_IDX', 'WEIGHT_COL_IDX'], _WEEKLY_CONFIG['column_map']
+        )
+
+    async def test_reads_every_day_in_one_call(self, mock_read):
+        """Test every day in the range is read with one call and days without a row are dropped."""
+        mock_read.return_value = [[7.5, 85.0], None, [8.0, 84.5]]
+
+        result = await self._fetch(date(2023, 12, 31), date(2024, 1, 2))
+
+        self.assertEqual(result, [[7.5, 85.0], [8.0, 84.5]])
+        mock_read.assert_awaited_once_with(
+            'sid', 'wsn', [date(2023, 12, 31), date(2024, 1, 1), date(2024, 1, 2)], 1, 2, 'dummy:token'
+        )
+
+    async def test_no_rows_or_read_error_returns_empty(self, mock_read):
+        """Test a range with no rows, or a failed read, is reported as no data rather than an error."""
+        for read_result in ([None, None], None):
+            with self.subTest(read_result=read_result):
+                mock_read.return_value = read_result
+
+                result = await self._fetch(date(2023, 11, 5), date(2023, 11, 6))
+
+                self.assertEqual(result, [])
+
+    @patch('src.bot.commands.summary.read_data_ranges_async')
+    async def test_single_day_reads_only_requested_columns(self, mock_read_ranges, mock_read):
+        """Test a single day fetches adjacent column runs in one call and lays them out as one row."""
+        column_map = {'DATE_COL_IDX': 0, 'STEPS_COL_IDX': 5, 'CALORIES_COL_IDX': 12, 'PROTEIN_COL_IDX': 13, 'FIBER_COL_IDX': 16}
+        mock_read_ranges.return_value = [[9000], [2100], [25]] # Protein is empty, so its trailing cell is dropped
+
+        result = await summary._fetch_and_process_summary_data(
+            MagicMock(spec=Update), MagicMock(), 'sid', 'wsn', 'dummy:token',
+            date(2024, 1, 2), date(2024, 1, 2), ['CALORIES_COL_IDX', 'PROTEIN_COL_IDX', 'FIBER_COL_IDX', 'STEPS_COL_IDX'], column_map
+        )
+
+        self.assertEqual(result, [[9000] + [None] * 6 + [2100, None, None, None, 25]])
+        mock_read_ranges.assert_awaited_once_with('sid', 'wsn', date(2024, 1, 2), [(5, 5), (12, 13), (16, 16)], 'dummy:token')
+        mock_read.assert_not_called()
+
+    def test_contiguous_col_ranges(self, mock_read):
+        """Test column indices are grouped into sorted runs of adjacent columns."""
+        self.assertEqual(summary._contiguous_col_ranges([16, 12, 5, 13, 14]), [(5, 5), (12, 14), (16, 16)])
+        self.assertEqual(summary._contiguous_col_ranges([3]), [(3, 3)])
 
-        mock_update.message.reply_html.assert_called_once()
-        reply_text = mock_update.message.reply_html.call_args[0][0]
-        self.assertIn("No data found for the period", reply_text)
-        
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -1,60 +1,67 @@
 import unittest
 from unittest.mock import patch, MagicMock, call
-from typing import List, Dict, Any
 
 # Module to test
 from src.services.nutrition import api
 
-class TestNutritionApi(unittest.TestCase):
-
-    def _create_mock_item(self, name: str, quantity: float) -> Dict[str, Any]:
-        return {"item": name, "quantity_g": quantity}
+# Parsed meal items shared across tests; get_nutrition_for_items only reads them
+APPLE_100 = {"item": "apple", "quantity_g": 100}
+BANANA_150 = {"item": "banana", "quantity_g": 150}
+UNKNOWN_FOOD_200 = {"item": "unknown food", "quantity_g": 200}
+WEIRD_FOOD_75 = {"item": "weird food", "quantity_g": 75}
+WEIRD_ITEM_1_50 = {"item": "weird item 1", "quantity_g": 50}
+WEIRD_ITEM_2_60 = {"item": "weird item 2", "quantity_g": 60}
+NO_NAME_50 = {"item": None, "quantity_g": 50} # Invalid (no name)
+BANANA_0 = {"item": "banana", "quantity_g": 0} # Invalid (zero quantity)
+ORANGE_NEG_10 = {"item": "orange", "quantity_g": -10} # Invalid (negative quantity)
+ITEMS_APPLE_BANANA = (APPLE_100, BANANA_150)
+
+# Gemini estimate for APPLE_100, and what it aggregates to on its own
+APPLE_GEMINI = {'calories': 52.0, 'protein': 0.3, 'carbs': 14.0, 'fat': 0.2, 'fiber': 2.4, 'source': 'Gemini'}
+APPLE_ONLY_RESULT = {'calories': 52, 'protein': 0, 'carbs': 14, 'fat': 0, 'fiber': 2}
 
-    @patch('src.services.nutrition.api._estimate_nutrition_with_gemini')
-    def test_get_nutrition_success_gemini_path(self, mock_estimate_gemini):
-        """Test successful path using ONLY Gemini data."""
-        items = [self._create_mock_item("apple", 100), self._create_mock_item("banana", 150)]
+class TestNutritionApi(unittest.TestCase):
 
-        # Mock Gemini estimations
-        mock_estimate_gemini.side_effect = [
-            {'calories': 55.0, 'protein': 0.5, 'carbs': 15.0, 'fat': 0.3, 'fiber': 2.5, 'source': 'Gemini (Estimate)'}, # Apple 100g
-            {'calories': 140.0, 'protein': 1.5, 'carbs': 35.0, 'fat': 0.6, 'fiber': 4.0, 'source': 'Gemini (Estimate)'} # Banana 150g
+    def setUp(self):
+        # Every test goes through the Gemini estimator; patch it once here rather than per method
+        patcher = patch('src.services.nutrition.api._estimate_nutrition_with_gemini')
+        self.mock_estimate_gemini = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_nutrition_for_items(self):
+        """Test aggregation over Gemini estimates that succeed, fail, or both."""
+        cases = [
+            # (name, items, Gemini result per item, expected aggregate)
+            ("all_succeed",
+             ITEMS_APPLE_BANANA,
+             [{'calories': 55.0, 'protein': 0.5, 'carbs': 15.0, 'fat': 0.3, 'fiber': 2.5, 'source': 'Gemini (Estimate)'}, # Apple 100g
+              {'calories': 140.0, 'protein': 1.5, 'carbs': 35.0, 'fat': 0.6, 'fiber': 4.0, 'source': 'Gemini (Estimate)'}], # Banana 150g
+             {'calories': round(55.0 + 140.0), 'protein': round(0.5 + 1.5), 'carbs': round(15.0 + 35.0),
+              'fat': round(0.3 + 0.6), 'fiber': round(2.5 + 4.0)}),
+            ("single_item",
+             (UNKNOWN_FOOD_200,),
+             [{'calories': 300.0, 'protein': 10.0, 'carbs': 40.0, 'fat': 12.0, 'fiber': 5.0, 'source': 'Gemini (Estimate)'}],
+             {'calories': 300, 'protein': 10, 'carbs': 40, 'fat': 12, 'fiber': 5}),
+            ("mixed_success_failure", # Only apple's data counts
+             (APPLE_100, WEIRD_FOOD_75),
+             [APPLE_GEMINI, None],
+             APPLE_ONLY_RESULT),
+            ("all_fail", # None if no items were processed successfully
+             (WEIRD_ITEM_1_50, WEIRD_ITEM_2_60),
+             [None, None],
+             None),
         ]
+        for name, items, gemini_results, expected_result in cases:
+            with self.subTest(name):
+                self.mock_estimate_gemini.reset_mock()
+                self.mock_estimate_gemini.side_effect = gemini_results
 
-        expected_result = {
-            'calories': round(55.0 + 140.0),
-            'protein': round(0.5 + 1.5),
-            'carbs': round(15.0 + 35.0),
-            'fat': round(0.3 + 0.6),
-            'fiber': round(2.5 + 4.0)
-        }
-
-        result = api.get_nutrition_for_items(items)
-
-        self.assertEqual(result, expected_result)
-        # Verify Gemini was called directly for each item
-        mock_estimate_gemini.assert_has_calls([call("apple", 100), call("banana", 150)])
-
-    # Test renamed and simplified: only tests Gemini direct call
-    @patch('src.services.nutrition.api._estimate_nutrition_with_gemini')
-    def test_get_nutrition_single_item_gemini(self, mock_estimate_gemini):
-        """Test successful Gemini estimation for a single item."""
-        items = [self._create_mock_item("unknown food", 200)]
+                result = api.get_nutrition_for_items(items)
 
-        # Mock Gemini estimation
-        mock_estimate_gemini.return_value = {
-            'calories': 300.0, 'protein': 10.0, 'carbs': 40.0, 'fat': 12.0, 'fiber': 5.0, 'source': 'Gemini (Estimate)'
-        }
-
-        expected_result = {
-            'calories': 300, 'protein': 10, 'carbs': 40, 'fat': 12, 'fiber': 5
-        }
-
-        result = api.get_nutrition_for_items(items)
-
-        self.assertEqual(result, expected_result)
-        # Verify Gemini was called
-        mock_estimate_gemini.assert_called_once_with("unknown food", 200)
+                self.assertEqual(result, expected_result)
+                # Gemini is called directly, once per item, in order (side_effect results are positional)
+                self.assertEqual(self.mock_estimate_gemini.call_args_list,
+                                 [call(item["item"], item["quantity_g"]) for item in items])
 
     def test_get_nutrition_empty_list(self):
         """Test with an empty input list."""
@@ -62,66 +69,26 @@ class TestNutritionApi(unittest.TestCase):
         self.assertIsNone(result)
 
     @patch('src.services.nutrition.api.logger') # Patch logger to check warnings
-    @patch('src.services.nutrition.api._estimate_nutrition_with_gemini') # Still need to patch Gemini
-    def test_get_nutrition_invalid_items(self, mock_estimate_gemini, mock_logger):
+    def test_get_nutrition_invalid_items(self, mock_logger):
         """Test with items having missing name or zero/negative quantity."""
-        items = [
-            self._create_mock_item("apple", 100), # Valid
-            {"item": None, "quantity_g": 50}, # Invalid (no name)
-            self._create_mock_item("banana", 0), # Invalid (zero quantity)
-            self._create_mock_item("orange", -10) # Invalid (negative quantity)
-        ]
+        items = (APPLE_100, NO_NAME_50, BANANA_0, ORANGE_NEG_10) # Only apple is valid
 
         # Mock successful processing for the valid item using Gemini
-        mock_estimate_gemini.return_value = {'calories': 52.0, 'protein': 0.3, 'carbs': 14.0, 'fat': 0.2, 'fiber': 2.4, 'source': 'Gemini'}
+        self.mock_estimate_gemini.return_value = APPLE_GEMINI
 
-        expected_result = {'calories': 52, 'protein': 0, 'carbs': 14, 'fat': 0, 'fiber': 2} # Only apple's data
         result = api.get_nutrition_for_items(items)
 
-        self.assertEqual(result, expected_result)
+        self.assertEqual(result, APPLE_ONLY_RESULT) # Only apple's data
         # Gemini should only be called for the valid item
-        mock_estimate_gemini.assert_called_once_with("apple", 100)
-
-        # Check that warnings were logged for invalid items
-        self.assertTrue(any("Skipping invalid item" in call_args[0][0] for call_args in mock_logger.warning.call_args_list))
-
-    # Test simplified to only check Gemini failure
-    @patch('src.services.nutrition.api._estimate_nutrition_with_gemini')
-    def test_get_nutrition_all_failed_gemini(self, mock_estimate_gemini):
-        """Test scenario where Gemini estimation fails for all items."""
-        items = [self._create_mock_item("weird item 1", 50), self._create_mock_item("weird item 2", 60)]
-
-        # Mock Gemini to fail
-        mock_estimate_gemini.return_value = None
-
-        result = api.get_nutrition_for_items(items)
-
-        self.assertIsNone(result) # Expect None if no items were processed successfully
-        # Verify Gemini was called for both items
-        mock_estimate_gemini.assert_has_calls([call("weird item 1", 50), call("weird item 2", 60)])
-
-    # Test simplified: one success (Gemini), one failure (Gemini)
-    @patch('src.services.nutrition.api._estimate_nutrition_with_gemini')
-    def test_get_nutrition_mixed_success_failure_gemini(self, mock_estimate_gemini):
-        """Test with a mix of items where Gemini succeeds and fails."""
-        items = [
-            self._create_mock_item("apple", 100),       # Success via Gemini
-            self._create_mock_item("weird food", 75)   # Fails Gemini lookup
-        ]
-
-        # Mock Gemini results: success for apple, failure for weird food
-        mock_estimate_gemini.side_effect = [
-            {'calories': 52.0, 'protein': 0.3, 'carbs': 14.0, 'fat': 0.2, 'fiber': 2.4, 'source': 'Gemini'},
-            None
-        ]
-
-        expected_result = {'calories': 52, 'protein': 0, 'carbs': 14, 'fat': 0, 'fiber': 2} # Only apple's data
-
-        result = api.get_nutrition_for_items(items)
-
-        self.assertEqual(result, expected_result)
-        # Verify Gemini was called for both
-        mock_estimate_gemini.assert_has_calls([call("apple", 100), call("weird food", 75)])
+        self.mock_estimate_gemini.assert_called_once_with("apple", 100)
+
+        # One warning per invalid item, then the summary of failed items - and nothing else
+        self.assertEqual(mock_logger.warning.call_args_list, [
+            call(f"Skipping invalid item: {NO_NAME_50}"),
+            call(f"Skipping invalid item: {BANANA_0}"),
+            call(f"Skipping invalid item: {ORANGE_NEG_10}"),
+            call("Failed Items: ['Unknown Item', 'banana', 'orange']"),
+        ])
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -1,24 +1,30 @@
 import unittest
-import json
-from unittest.mock import patch, MagicMock, ANY
+from types import SimpleNamespace
+from unittest.mock import patch
 
 # Module to test
 from src.services.nutrition import gemini_handler
 
+def _resp(text):
+    """Builds a stand-in for a Gemini response; the handler only reads .text."""
+    return SimpleNamespace(text=text)
+
 # Mock AIModelManager and its methods upfront
 @patch('src.services.nutrition.gemini_handler.AIModelManager')
 class TestGeminiHandler(unittest.TestCase):
 
+    def setUp(self):
+        # _estimate_nutrition_with_gemini is lru_cached; start every test from an empty cache
+        gemini_handler._estimate_nutrition_with_gemini.cache_clear()
+
     # --- Tests for _estimate_nutrition_with_gemini --- #
 
     def test_estimate_nutrition_success(self, MockAIModelManager):
-        """Test successful nutrition estimation."""
-        mock_model_instance = MagicMock()
-        mock_response = MagicMock()
+        """Test successful nutrition estimation through the real fence stripping and JSON parsing."""
         # Test with markdown code fence
-        mock_response.text = '```json\n{"calories": 250.0, "protein": 10.5, "carbs": 30.0, "fat": 8.2, "fiber": 3.1}\n```'
-        mock_model_instance.generate_content.return_value = mock_response
-        MockAIModelManager.get_model.return_value = mock_model_instance
+        MockAIModelManager.generate_content.return_value = _resp(
+            '```json\n{"calories": 250.0, "protein": 10.5, "carbs": 30.0, "fat": 8.2, "fiber": 3.1}\n```'
+        )
 
         item_name = "chicken breast"
         quantity_g = 150.0
@@ -31,74 +37,72 @@ class TestGeminiHandler(unittest.TestCase):
             'source': 'Gemini (Estimate)'
         }
 
-        # Clear cache before test if needed
-        gemini_handler._estimate_nutrition_with_gemini.cache_clear()
-
         result = gemini_handler._estimate_nutrition_with_gemini(item_name, quantity_g)
         self.assertEqual(result, expected_result)
-        MockAIModelManager.get_model.assert_called_once_with('nutrition')
-        mock_model_instance.generate_content.assert_called_once_with(
-            ANY, # Don't need to check the exact prompt string
-            request_options={'timeout': 30}
-        )
-
-    def test_estimate_nutrition_invalid_json(self, MockAIModelManager):
-        """Test handling of invalid JSON response."""
-        mock_model_instance = MagicMock()
-        mock_response = MagicMock()
-        mock_response.text = '{"calories": 100, protein: 5' # Missing quotes
-        mock_model_instance.generate_content.return_value = mock_response
-        MockAIModelManager.get_model.return_value = mock_model_instance
-
-        gemini_handler._estimate_nutrition_with_gemini.cache_clear()
-        result = gemini_handler._estimate_nutrition_with_gemini("test", 100)
-        self.assertIsNone(result)
-
-    def test_estimate_nutrition_missing_keys(self, MockAIModelManager):
-        """Test handling of JSON missing required keys."""
-        mock_model_instance = MagicMock()
-        mock_response = MagicMock()
-        mock_response.text = '{"calories": 100, "protein": 5}' # Missing other keys
-        mock_model_instance.generate_content.return_value = mock_response
-        MockAIModelManager.get_model.return_value = mock_model_instance
-
-        gemini_handler._estimate_nutrition_with_gemini.cache_clear()
-        result = gemini_handler._estimate_nutrition_with_gemini("test", 100)
-        self.assertIsNone(result)
-
-    def test_estimate_nutrition_non_numeric_values(self, MockAIModelManager):
-        """Test handling of JSON with non-numeric values."""
-        mock_model_instance = MagicMock()
-        mock_response = MagicMock()
-        mock_response.text = '{"calories": "high", "protein": 10.5, "carbs": 30.0, "fat": 8.2, "fiber": 3.1}'
-        mock_model_instance.generate_content.return_value = mock_response
-        MockAIModelManager.get_model.return_value = mock_model_instance
-
-        gemini_handler._estimate_nutrition_with_gemini.cache_clear()
-        result = gemini_handler._estimate_nutrition_with_gemini("test", 100)
-        self.assertIsNone(result)
-
-    def test_estimate_nutrition_not_a_dict(self, MockAIModelManager):
-        """Test handling when response is not a JSON object."""
-        mock_model_instance = MagicMock()
-        mock_response = MagicMock()
-        mock_response.text = '[1, 2, 3]' # JSON array, not object
-        mock_model_instance.generate_content.return_value = mock_response
-        MockAIModelManager.get_model.return_value = mock_model_instance
-
-        gemini_handler._estimate_nutrition_with_gemini.cache_clear()
-        result = gemini_handler._estimate_nutrition_with_gemini("test", 100)
-        self.assertIsNone(result)
+        MockAIModelManager.generate_content.assert_called_once()
+        kwargs = MockAIModelManager.generate_content.call_args.kwargs
+        self.assertEqual(kwargs['use_case'], 'nutrition')
+        self.assertEqual(kwargs['config'], {"temperature": 0.2})
+        # The prompt must name the item and the quantity it's estimating for
+        (prompt,) = kwargs['contents']
+        self.assertIn('Food Item: "chicken breast"', prompt)
+        self.assertIn("Quantity: 150.0 grams", prompt)
+
+    def test_estimate_nutrition_strips_code_fences(self, MockAIModelManager):
+        """Test the JSON is found with or without a surrounding markdown fence."""
+        payload = '{"calories": 90.0, "protein": 1.0, "carbs": 20.0, "fat": 0.5, "fiber": 2.0}'
+        cases = [
+            ("no_fence", payload),
+            ("json_fence", f"```json\n{payload}\n```"),
+            ("bare_fence", f"```\n{payload}\n```"),
+            ("padded_fence", f"  ```JSON {payload} ```\n"),
+        ]
+        for name, text in cases:
+            with self.subTest(name):
+                MockAIModelManager.generate_content.return_value = _resp(text)
+
+                result = gemini_handler._estimate_nutrition_with_gemini(name, 100) # Distinct args so the cache can't answer
+                self.assertEqual(result, {
+                    'calories': 90.0, 'protein': 1.0, 'carbs': 20.0, 'fat': 0.5, 'fiber': 2.0,
+                    'source': 'Gemini (Estimate)'
+                })
+
+    @patch('src.services.nutrition.gemini_handler.json.loads')
+    def test_estimate_nutrition_coerces_values_to_float(self, mock_json_loads, MockAIModelManager):
+        """Test that integer estimates come back as floats (JSON parsing stubbed out)."""
+        MockAIModelManager.generate_content.return_value = _resp('{"parsed": "by the mock"}')
+        mock_json_loads.return_value = {"calories": 250, "protein": 10, "carbs": 30, "fat": 8, "fiber": 3}
+
+        result = gemini_handler._estimate_nutrition_with_gemini("rice", 200.0)
+
+        mock_json_loads.assert_called_once_with('{"parsed": "by the mock"}')
+        self.assertEqual(result, {
+            'calories': 250.0, 'protein': 10.0, 'carbs': 30.0, 'fat': 8.0, 'fiber': 3.0,
+            'source': 'Gemini (Estimate)'
+        })
+        self.assertTrue(all(isinstance(result[k], float) for k in ('calories', 'protein', 'carbs', 'fat', 'fiber')))
+
+    def test_estimate_nutrition_malformed_response(self, MockAIModelManager):
+        """Test that unusable Gemini responses yield None."""
+        cases = [
+            ("invalid_json", '{"calories": 100, protein: 5'), # Missing quotes
+            ("missing_keys", '{"calories": 100, "protein": 5}'), # Missing other keys
+            ("non_numeric_values", '{"calories": "high", "protein": 10.5, "carbs": 30.0, "fat": 8.2, "fiber": 3.1}'),
+            ("not_a_dict", '[1, 2, 3]'), # JSON array, not object
+        ]
+        for name, bad_text in cases:
+            with self.subTest(name):
+                MockAIModelManager.generate_content.return_value = _resp(bad_text)
+
+                result = gemini_handler._estimate_nutrition_with_gemini(name, 100) # Distinct args so the cache can't answer
+                self.assertIsNone(result)
 
     def test_estimate_nutrition_api_error(self, MockAIModelManager):
         """Test handling of Gemini API call failure."""
-        mock_model_instance = MagicMock()
-        mock_model_instance.generate_content.side_effect = Exception("Service Unavailable")
-        MockAIModelManager.get_model.return_value = mock_model_instance
+        MockAIModelManager.generate_content.side_effect = Exception("Service Unavailable")
 
-        gemini_handler._estimate_nutrition_with_gemini.cache_clear()
         result = gemini_handler._estimate_nutrition_with_gemini("test", 100)
         self.assertIsNone(result)
 
 if __name__ == '__main__':
-    unittest.main() 
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,15 @@
+"""Shared helpers for the sheets service tests."""
+
+from types import SimpleNamespace
+import gspread
+
+def api_error(status_code, message="error", text=""):
+    """Builds a gspread APIError carrying the given HTTP status code.
+    The response is a lightweight stand-in for a requests.Response; APIError and _with_retry only read these fields.
+    """
+    error_body = {"error": {"code": status_code, "message": message}}
+    return gspread.exceptions.APIError(SimpleNamespace(status_code=status_code, text=text, json=lambda: error_body))
+
+# Shared API errors for the error-path tests: one the retry loop gives up on at once, one it retries
+API_ERROR = api_error(400, "Bad request")
+RETRYABLE_API_ERROR = api_error(500, "Backend error")
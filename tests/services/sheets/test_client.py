@@ -0,0 +1,184 @@
+import unittest
+import threading
+from unittest.mock import patch, MagicMock
+import gspread # Import for exceptions
+
+# Module to test
+from src.services.sheets import client
+from .helpers import api_error
+
+@patch('src.services.sheets.client.time.sleep')
+class TestSheetsClientRetry(unittest.TestCase):
+
+    def test_with_retry_success_first_try(self, mock_sleep):
+        """Test a successful call is made once and its result returned."""
+        func = MagicMock(return_value=[['Oct 27']])
+
+        result = client._with_retry(func, "A2:A10", value_render_option='UNFORMATTED_VALUE')
+
+        self.assertEqual(result, [['Oct 27']])
+        func.assert_called_once_with("A2:A10", value_render_option='UNFORMATTED_VALUE')
+        mock_sleep.assert_not_called()
+
+    def test_with_retry_recovers_from_rate_limit(self, mock_sleep):
+        """Test a 429 is retried with backoff until the call succeeds."""
+        func = MagicMock(side_effect=[api_error(429), api_error(503), "ok"])
+
+        result = client._with_retry(func)
+
+        self.assertEqual(result, "ok")
+        self.assertEqual(func.call_count, 3)
+        self.assertEqual(mock_sleep.call_count, 2)
+
+    def test_with_retry_does_not_retry_client_errors(self, mock_sleep):
+        """Test non-retryable statuses are raised immediately."""
+        func = MagicMock(side_effect=api_error(403))
+
+        with self.assertRaises(gspread.exceptions.APIError):
+            client._with_retry(func)
+
+        func.assert_called_once()
+        mock_sleep.assert_not_called()
+
+    def test_with_retry_gives_up_after_max_attempts(self, mock_sleep):
+        """Test persistent server errors are re-raised after the last attempt."""
+        func = MagicMock(side_effect=api_error(500))
+
+        with self.assertRaises(gspread.exceptions.APIError):
+            client._with_retry(func)
+
+        self.assertEqual(func.call_count, client.MAX_REQUEST_ATTEMPTS)
+        self.assertEqual(mock_sleep.call_count, client.MAX_REQUEST_ATTEMPTS - 1)
+
+    def test_with_rate_limit_retry_only_retries_429(self, mock_sleep):
+        """Test non-idempotent calls retry a 429 but not a 5xx the server may have applied."""
+        func = MagicMock(side_effect=[api_error(429), "ok"])
+        self.assertEqual(client._with_rate_limit_retry(func), "ok")
+        self.assertEqual(func.call_count, 2)
+
+        for status_code in (500, 503):
+            with self.subTest(status_code=status_code):
+                func = MagicMock(side_effect=api_error(status_code))
+                with self.assertRaises(gspread.exceptions.APIError):
+                    client._with_rate_limit_retry(func)
+                func.assert_called_once()
+
+class TestCreateGspreadClient(unittest.TestCase):
+
+    @patch('src.services.sheets.client.gspread.Client')
+    @patch('src.services.sheets.client.AuthorizedSession')
+    @patch('src.services.sheets.client.service_account.Credentials.from_service_account_info')
+    @patch('src.services.sheets.client.get_config')
+    def test_client_uses_pooled_session(self, mock_get_config, mock_from_info, mock_session_cls, mock_client_cls):
+        """Test the client is built on one shared session with an enlarged connection pool."""
+        mock_get_config.return_value.service_account_json_string = '{"type": "service_account"}'
+
+        result = client._create_gspread_client()
+
+        mock_session_cls.assert_called_once_with(mock_from_info.return_value)
+        prefix, adapter = mock_session_cls.return_value.mount.call_args.args
+        self.assertEqual(prefix, "https://")
+        self.assertEqual(adapter._pool_maxsize, client.HTTP_POOL_MAXSIZE)
+        mock_client_cls.assert_called_once_with(auth=mock_from_info.return_value, session=mock_session_cls.return_value)
+        self.assertIs(result, mock_client_cls.return_value)
+
+@patch('src.services.sheets.client._create_gspread_client')
+class TestInitSheets(unittest.TestCase):
+
+    def setUp(self):
+        client._gspread_client = None
+
+    def tearDown(self):
+        client._gspread_client = None
+
+    def test_init_sheets_creates_client_once(self, mock_create):
+        """Test init_sheets authorizes eagerly and later lookups reuse the same client."""
+        mock_create.return_value = MagicMock()
+
+        self.assertTrue(client.init_sheets())
+
+        self.assertIs(client._get_gspread_client(), mock_create.return_value)
+        mock_create.assert_called_once()
+
+    def test_init_sheets_failure_falls_back_to_lazy_init(self, mock_create):
+        """Test a failed startup init returns False and the next lookup retries."""
+        lazy_client = MagicMock()
+        mock_create.side_effect = [ValueError("Missing service account credentials"), lazy_client]
+
+        self.assertFalse(client.init_sheets())
+
+        self.assertIs(client._get_gspread_client(), lazy_client)
+        self.assertEqual(mock_create.call_count, 2)
+
+@patch('src.services.sheets.client._get_gspread_client')
+class TestWorksheetCache(unittest.TestCase):
+
+    def setUp(self):
+        client._worksheet_cache.clear()
+        client._worksheet_fetch_locks.clear()
+
+    def tearDown(self):
+        client._worksheet_cache.clear()
+        client._worksheet_fetch_locks.clear()
+
+    def test_get_worksheet_cached(self, mock_get_client):
+        """Test a second lookup for the same worksheet doesn't hit the API."""
+        first = client._get_worksheet("sheet_id", "ws_name")
+        second = client._get_worksheet("sheet_id", "ws_name")
+
+        self.assertIs(first, second)
+        mock_get_client.return_value.open_by_key.assert_called_once_with("sheet_id")
+
+    @patch('src.services.sheets.client.WORKSHEET_CACHE_MAX_SIZE', 2)
+    def test_get_worksheet_evicts_least_recently_used(self, mock_get_client):
+        """Test the cache is bounded and evicts the least recently used worksheet."""
+        client._get_worksheet("sheet_a", "ws")
+        client._get_worksheet("sheet_b", "ws")
+        client._get_worksheet("sheet_a", "ws") # sheet_a is now most recent
+        client._get_worksheet("sheet_c", "ws")
+
+        self.assertEqual(list(client._worksheet_cache), [("sheet_a", "ws"), ("sheet_c", "ws")])
+        self.assertEqual(set(client._worksheet_fetch_locks), {("sheet_a", "ws"), ("sheet_c", "ws")}) # Evicted key's lock dropped
+
+    def test_get_worksheet_failed_fetch_keeps_no_lock(self, mock_get_client):
+        """Test a worksheet that fails to load leaves neither a cache entry nor a fetch lock behind."""
+        mock_get_client.return_value.open_by_key.return_value.worksheet.side_effect = gspread.exceptions.WorksheetNotFound("ws")
+
+        self.assertIsNone(client._get_worksheet("sheet_id", "missing_ws"))
+
+        self.assertEqual(client._worksheet_cache, {})
+        self.assertEqual(client._worksheet_fetch_locks, {})
+
+    def test_get_worksheet_expired_entry_refetched(self, mock_get_client):
+        """Test entries older than the TTL are fetched again."""
+        client._get_worksheet("sheet_id", "ws_name")
+        fetched_at, worksheet = client._worksheet_cache[("sheet_id", "ws_name")]
+        client._worksheet_cache[("sheet_id", "ws_name")] = (fetched_at - client.WORKSHEET_CACHE_TTL_SECONDS - 1, worksheet)
+
+        client._get_worksheet("sheet_id", "ws_name")
+
+        self.assertEqual(mock_get_client.return_value.open_by_key.call_count, 2)
+
+    def test_get_worksheet_fetches_distinct_worksheets_in_parallel(self, mock_get_client):
+        """Test a slow fetch of one worksheet doesn't block fetching another."""
+        sheet_a_started, release_sheet_a = threading.Event(), threading.Event()
+
+        def open_by_key(sheet_id):
+            if sheet_id == "sheet_a":
+                sheet_a_started.set()
+                release_sheet_a.wait(timeout=5)
+            return MagicMock()
+        mock_get_client.return_value.open_by_key.side_effect = open_by_key
+
+        slow_fetch = threading.Thread(target=client._get_worksheet, args=("sheet_a", "ws"))
+        slow_fetch.start()
+        try:
+            self.assertTrue(sheet_a_started.wait(timeout=5))
+            self.assertIsNotNone(client._get_worksheet("sheet_b", "ws")) # Completes while sheet_a is in flight
+        finally:
+            release_sheet_a.set()
+            slow_fetch.join(timeout=5)
+        self.assertEqual(len(client._worksheet_cache), 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,14 +1,19 @@
 import unittest
 from unittest.mock import patch, MagicMock
-import gspread # Import for exceptions
-import requests
 from datetime import datetime # Import datetime
 
 # Module to test
-from src.services.sheets import reader
+from src.services.sheets import reader, client, rows
+from src.services.sheets.utils import _build_sheet_details
+from .helpers import api_error, API_ERROR
+
+# Shared target dates, keyed by day of October 2023 (plus Nov 1, which no test sheet has)
+_DT = {day: datetime(2023, 10, day) for day in range(27, 32)}
+_DT_NOV_1 = datetime(2023, 11, 1)
+
 
 # Mock the helper functions used within reader.py
-@patch('src.services.sheets.reader.find_row_by_date') # Mock find_row used by reader
+@patch('src.services.sheets.reader._find_row_by_date') # Mock find_row used by reader
 @patch('src.services.sheets.reader._get_bot_sheet_details') # Mock details helper used by reader
 class TestSheetsReader(unittest.TestCase):
 
@@ -20,13 +25,13 @@ class TestSheetsReader(unittest.TestCase):
         ]
         mock_ws.get.return_value = [expected_data[0]] # worksheet.get returns list of lists
         # Mock the details helper to return the mock worksheet
-        mock_get_details.return_value = (mock_ws, {'DATE_COL_IDX': 0}, 2, "sheet_id", "ws_name")
+        mock_get_details.return_value = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 0}, 2, "sheet_id", "ws_name")
         # Mock find_row_by_date to return a valid row index
         mock_find_row.return_value = 5 # Example 0-based index
 
         sheet_id = "test_sheet_id" 
         worksheet_name = "metrics_ws"
-        target_dt = datetime(2023, 10, 27) # Provide datetime object
+        target_dt = _DT[27]
         # Example: reading columns 1 and 2 (Weight, Calories)
         start_col_idx = 1
         end_col_idx = 2
@@ -38,19 +43,19 @@ class TestSheetsReader(unittest.TestCase):
 
         self.assertEqual(result, expected_data[0]) # Expect the inner list
         mock_get_details.assert_called_once_with(bot_token)
-        mock_find_row.assert_called_once_with(sheet_id, worksheet_name, target_dt, bot_token)
+        mock_find_row.assert_called_once_with(mock_get_details.return_value, target_dt)
         mock_ws.get.assert_called_once_with(expected_a1_range, value_render_option='UNFORMATTED_VALUE')
 
     def test_read_data_range_empty_result(self, mock_get_details, mock_find_row):
         """Test reading when the sheet range returns an empty list/no values."""
         mock_ws = MagicMock()
         mock_ws.get.return_value = [] # Simulate empty result from .get()
-        mock_get_details.return_value = (mock_ws, {'DATE_COL_IDX': 0}, 2, "sheet_id", "ws_name")
+        mock_get_details.return_value = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 0}, 2, "sheet_id", "ws_name")
         mock_find_row.return_value = 7 # Found the row
 
         sheet_id = "test_sheet_id"
         worksheet_name = "empty_ws"
-        target_dt = datetime(2023, 10, 28)
+        target_dt = _DT[28]
         start_col_idx = 1
         end_col_idx = 3
         bot_token = "dummy_token"
@@ -61,7 +66,7 @@ class TestSheetsReader(unittest.TestCase):
 
         self.assertEqual(result, expected_none_list) # Expect list of Nones
         mock_get_details.assert_called_once_with(bot_token)
-        mock_find_row.assert_called_once_with(sheet_id, worksheet_name, target_dt, bot_token)
+        mock_find_row.assert_called_once_with(mock_get_details.return_value, target_dt)
         mock_ws.get.assert_called_once_with(expected_a1_range, value_render_option='UNFORMATTED_VALUE')
 
     def test_read_data_range_details_helper_fails(self, mock_get_details, mock_find_row):
@@ -70,7 +75,7 @@ class TestSheetsReader(unittest.TestCase):
 
         sheet_id = "test_sheet_id"
         worksheet_name = "bad_ws_name" 
-        target_dt = datetime(2023, 10, 29)
+        target_dt = _DT[29]
         start_col_idx = 0 
         end_col_idx = 1
         bot_token = "dummy_token_fails_config"
@@ -84,12 +89,12 @@ class TestSheetsReader(unittest.TestCase):
     def test_read_data_range_find_row_fails(self, mock_get_details, mock_find_row):
         """Test handling when find_row_by_date returns None."""
         mock_ws = MagicMock()
-        mock_get_details.return_value = (mock_ws, {'DATE_COL_IDX': 0}, 2, "sheet_id", "ws_name")
+        mock_get_details.return_value = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 0}, 2, "sheet_id", "ws_name")
         mock_find_row.return_value = None # Simulate date not found
 
         sheet_id = "test_sheet_id"
         worksheet_name = "metrics_ws"
-        target_dt = datetime(2023, 10, 30)
+        target_dt = _DT[30]
         start_col_idx = 1 
         end_col_idx = 2
         bot_token = "dummy_token"
@@ -98,23 +103,20 @@ class TestSheetsReader(unittest.TestCase):
 
         self.assertIsNone(result)
         mock_get_details.assert_called_once_with(bot_token)
-        mock_find_row.assert_called_once_with(sheet_id, worksheet_name, target_dt, bot_token)
+        mock_find_row.assert_called_once_with(mock_get_details.return_value, target_dt)
         mock_ws.get.assert_not_called() # Should fail before getting range
 
-    def test_read_data_range_get_error(self, mock_get_details, mock_find_row):
-        """Test handling when worksheet.get() raises an exception."""
+    @patch('src.services.sheets.client.time.sleep')
+    def test_read_data_range_get_error(self, mock_sleep, mock_get_details, mock_find_row):
+        """Test handling when worksheet.get() keeps raising a retryable exception."""
         mock_ws = MagicMock()
-        mock_response = MagicMock(spec=requests.Response)
-        mock_response.status_code = 500
-        mock_response.text = "Internal Server Error"
-        mock_response.json.return_value = {"error": {"code": 500, "message": "Read failed"}}
-        mock_ws.get.side_effect = gspread.exceptions.APIError(mock_response)
-        mock_get_details.return_value = (mock_ws, {'DATE_COL_IDX': 0}, 2, "sheet_id", "ws_name")
+        mock_ws.get.side_effect = api_error(500, "Read failed", text="Internal Server Error")
+        mock_get_details.return_value = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 0}, 2, "sheet_id", "ws_name")
         mock_find_row.return_value = 9 # Found the row (0-based index for row 10)
 
         sheet_id = "test_sheet_id"
         worksheet_name = "metrics_ws"
-        target_dt = datetime(2023, 10, 31)
+        target_dt = _DT[31]
         start_col_idx = 1 
         end_col_idx = 1
         bot_token = "dummy_token"
@@ -126,8 +128,104 @@ class TestSheetsReader(unittest.TestCase):
 
         self.assertIsNone(result)
         mock_get_details.assert_called_once_with(bot_token)
-        mock_find_row.assert_called_once_with(sheet_id, worksheet_name, target_dt, bot_token)
-        mock_ws.get.assert_called_once_with(expected_a1_range, value_render_option='UNFORMATTED_VALUE')
+        mock_find_row.assert_called_once_with(mock_get_details.return_value, target_dt)
+        # 500 is retried up to the attempt limit, always with the same range
+        self.assertEqual(mock_ws.get.call_count, client.MAX_REQUEST_ATTEMPTS)
+        mock_ws.get.assert_called_with(expected_a1_range, value_render_option='UNFORMATTED_VALUE')
+
+    def test_read_data_ranges_single_batch_get(self, mock_get_details, mock_find_row):
+        """Test several ranges for one date are read with one batch_get."""
+        mock_ws = MagicMock()
+        mock_ws.batch_get.return_value = [[['76', '2200']], []] # Second range empty
+        mock_get_details.return_value = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 0}, 2, "sheet_id", "ws_name")
+        mock_find_row.return_value = 5
+        target_dt = _DT[27]
+
+        result = reader.read_data_ranges("test_sheet_id", "metrics_ws", target_dt, [(1, 2), (5, 7)], "dummy_token")
+
+        self.assertEqual(result, [['76', '2200'], [None, None, None]])
+        mock_find_row.assert_called_once_with(mock_get_details.return_value, target_dt)
+        mock_ws.batch_get.assert_called_once_with(["B6:C6", "F6:H6"], value_render_option='UNFORMATTED_VALUE')
+        mock_ws.get.assert_not_called()
+
+    def test_read_data_ranges_find_row_fails(self, mock_get_details, mock_find_row):
+        """Test read_data_ranges returns None when the date row is missing."""
+        mock_ws = MagicMock()
+        mock_get_details.return_value = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 0}, 2, "sheet_id", "ws_name")
+        mock_find_row.return_value = None
+
+        result = reader.read_data_ranges("test_sheet_id", "metrics_ws", _DT[30], [(1, 2)], "dummy_token")
+
+        self.assertIsNone(result)
+        mock_ws.batch_get.assert_not_called()
+
+@patch('src.services.sheets.reader._get_bot_sheet_details')
+class TestReadDateRows(unittest.TestCase):
+
+    def setUp(self):
+        rows.invalidate_date_column_cache()
+
+    def tearDown(self):
+        rows.invalidate_date_column_cache()
+
+    def test_read_date_rows_single_batch_get(self, mock_get_details):
+        """Test several dates are located from one date column read and fetched in one batch_get."""
+        mock_ws = MagicMock()
+        mock_ws.get.return_value = [['Oct 26'], ['Oct 27'], [], ['Oct 29']] # Rows 2-5
+        mock_ws.batch_get.return_value = [[['2100', '150']], []]
+        mock_get_details.return_value = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 0}, 1, "sheet_id", "ws_name")
+        days = [_DT[27], _DT[28], _DT[29]]
+
+        result = reader.read_date_rows("test_sheet_id", "metrics_ws", days, 1, 2, "dummy_token")
+
+        self.assertEqual(result, [['2100', '150'], None, [None, None]])
+        mock_ws.get.assert_called_once_with("A2:A")
+        mock_ws.batch_get.assert_called_once_with(["B3:C3", "B5:C5"], value_render_option='UNFORMATTED_VALUE')
+
+    def test_read_date_rows_no_matching_dates(self, mock_get_details):
+        """Test no batch_get is issued when none of the dates have rows."""
+        mock_ws = MagicMock()
+        mock_ws.get.return_value = [['Oct 26'], ['Oct 27']]
+        mock_get_details.return_value = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 0}, 1, "sheet_id", "ws_name")
+
+        result = reader.read_date_rows("test_sheet_id", "metrics_ws", [_DT_NOV_1], 1, 2, "dummy_token")
+
+        self.assertEqual(result, [None])
+        mock_ws.batch_get.assert_not_called()
+
+    def test_read_date_rows_api_error(self, mock_get_details):
+        """Test an API error on the batch read returns None."""
+        mock_ws = MagicMock()
+        mock_ws.get.return_value = [['Oct 27']]
+        mock_ws.batch_get.side_effect = API_ERROR
+        mock_get_details.return_value = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 0}, 1, "sheet_id", "ws_name")
+
+        result = reader.read_date_rows("test_sheet_id", "metrics_ws", [_DT[27]], 1, 2, "dummy_token")
+
+        self.assertIsNone(result)
+
+class TestSheetsReaderAsync(unittest.IsolatedAsyncioTestCase):
+
+    @patch('src.services.sheets.reader.read_date_rows')
+    async def test_read_date_rows_async_delegates(self, mock_read):
+        """Test the async wrapper runs read_date_rows and returns its result."""
+        mock_read.return_value = [['76', '2200'], None]
+        target_dts = [_DT[27], _DT[28]]
+
+        result = await reader.read_date_rows_async("test_sheet_id", "metrics_ws", target_dts, 1, 2, "dummy_token")
+
+        self.assertEqual(result, [['76', '2200'], None])
+        mock_read.assert_called_once_with("test_sheet_id", "metrics_ws", target_dts, 1, 2, "dummy_token")
+
+    @patch('src.services.sheets.reader.read_data_ranges')
+    async def test_read_data_ranges_async_delegates(self, mock_read):
+        """Test the async wrapper runs read_data_ranges and returns its result."""
+        mock_read.return_value = [['9000'], ['2200', '150']]
+
+        result = await reader.read_data_ranges_async("test_sheet_id", "metrics_ws", _DT[27], [(5, 5), (12, 13)], "dummy_token")
+
+        self.assertEqual(result, [['9000'], ['2200', '150']])
+        mock_read.assert_called_once_with("test_sheet_id", "metrics_ws", _DT[27], [(5, 5), (12, 13)], "dummy_token")
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
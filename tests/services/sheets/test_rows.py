@@ -1,21 +1,29 @@
 import unittest
 import datetime
-from unittest.mock import patch, MagicMock, call
+from unittest.mock import patch, Mock, MagicMock, call
 import gspread # Import for exceptions
-import requests
 
 # Module to test
-from src.services.sheets import rows
+from src.services.sheets import rows, client
+from src.services.sheets.utils import _build_sheet_details
+from .helpers import API_ERROR, RETRYABLE_API_ERROR
 
-# Mock the helper function and potentially find_row_by_date
+# Shared target dates, keyed by day of October / November 2023
+_OCT = {day: datetime.datetime(2023, 10, day) for day in range(20, 31)}
+_NOV = {day: datetime.datetime(2023, 11, day) for day in range(1, 5)}
+
+# Mock the details helper function
 # Patch target should be where _get_bot_sheet_details is LOOKED UP, which is in rows.py
 @patch('src.services.sheets.rows._get_bot_sheet_details') 
 class TestSheetsRows(unittest.TestCase):
 
+    def setUp(self):
+        # Each test supplies its own worksheet data
+        rows.invalidate_date_column_cache()
+
     def test_find_row_by_date_found(self, mock_get_details):
         """Test finding an existing row by date."""
-        mock_ws = MagicMock()
-        mock_ws.row_count = 10 # Set row count
+        mock_ws = Mock(spec=gspread.Worksheet)
         mock_cell = MagicMock()
         mock_cell.row = 5 # gspread cell row is 1-based
         # Setup mock worksheet methods needed by find_row_by_date
@@ -23,11 +31,11 @@ class TestSheetsRows(unittest.TestCase):
         # Mock the details helper return value
         mock_column_map = {'DATE_COL_IDX': 0} 
         mock_first_data_row = 1 # 0-based index for first data row
-        mock_get_details.return_value = (mock_ws, mock_column_map, mock_first_data_row, "sheet_id", "ws_name")
+        mock_get_details.return_value = _build_sheet_details(mock_ws, mock_column_map, mock_first_data_row, "sheet_id", "ws_name")
 
         sheet_id = "test_sheet_id"
         worksheet_name = "test_ws_name"
-        target_dt = datetime.datetime(2023, 10, 27)
+        target_dt = _OCT[27]
         bot_token = "dummy_token"
 
         result = rows.find_row_by_date(sheet_id, worksheet_name, target_dt, bot_token)
@@ -36,29 +44,28 @@ class TestSheetsRows(unittest.TestCase):
         expected_row_index = 2 + mock_first_data_row
         self.assertEqual(result, expected_row_index)
         mock_get_details.assert_called_once_with(bot_token)
-        # Correct assertion: Use mock_ws.row_count for range calculation
-        expected_range = f"A{mock_first_data_row + 1}:A{mock_ws.row_count}"
+        # The date column is read open-ended; the API trims it to the last non-empty row
+        expected_range = f"A{mock_first_data_row + 1}:A"
         mock_ws.get.assert_called_once_with(expected_range)
 
     def test_find_row_by_date_not_found(self, mock_get_details):
         """Test when the date is not found in the sheet."""
-        mock_ws = MagicMock()
-        mock_ws.row_count = 5 # Set row count
+        mock_ws = Mock(spec=gspread.Worksheet)
         mock_ws.get.return_value = [['Oct 25'], ['Oct 26']]
         mock_column_map = {'DATE_COL_IDX': 0}
         mock_first_data_row = 0
-        mock_get_details.return_value = (mock_ws, mock_column_map, mock_first_data_row, "sheet_id", "ws_name")
+        mock_get_details.return_value = _build_sheet_details(mock_ws, mock_column_map, mock_first_data_row, "sheet_id", "ws_name")
 
         sheet_id = "test_sheet_id"
         worksheet_name = "test_ws_name"
-        target_dt = datetime.datetime(2023, 10, 28)
+        target_dt = _OCT[28]
         bot_token = "dummy_token"
 
         result = rows.find_row_by_date(sheet_id, worksheet_name, target_dt, bot_token)
 
         self.assertIsNone(result)
         mock_get_details.assert_called_once_with(bot_token)
-        expected_range = f"A{mock_first_data_row + 1}:A{mock_ws.row_count}"
+        expected_range = f"A{mock_first_data_row + 1}:A"
         mock_ws.get.assert_called_once_with(expected_range)
 
     def test_find_row_by_date_details_helper_fails(self, mock_get_details):
@@ -67,7 +74,7 @@ class TestSheetsRows(unittest.TestCase):
 
         sheet_id = "test_sheet_id"
         worksheet_name = "bad_ws_name"
-        target_dt = datetime.datetime(2023, 10, 29)
+        target_dt = _OCT[29]
         bot_token = "dummy_token_fails"
 
         result = rows.find_row_by_date(sheet_id, worksheet_name, target_dt, bot_token)
@@ -75,67 +82,123 @@ class TestSheetsRows(unittest.TestCase):
         self.assertIsNone(result)
         mock_get_details.assert_called_once_with(bot_token)
 
-    def test_find_row_by_date_get_error(self, mock_get_details):
-        """Test handling when worksheet.get raises an exception."""
-        mock_ws = MagicMock()
-        mock_ws.row_count = 10 # Set row count
-        mock_response = MagicMock(spec=requests.Response)
-        mock_response.status_code = 500
-        mock_ws.get.side_effect = gspread.exceptions.APIError(mock_response)
+    @patch('src.services.sheets.client.time.sleep')
+    def test_find_row_by_date_get_error(self, mock_sleep, mock_get_details):
+        """Test handling when worksheet.get keeps raising a retryable exception."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        mock_ws.get.side_effect = RETRYABLE_API_ERROR
         mock_column_map = {'DATE_COL_IDX': 0}
         mock_first_data_row = 0
-        mock_get_details.return_value = (mock_ws, mock_column_map, mock_first_data_row, "sheet_id", "ws_name")
+        mock_get_details.return_value = _build_sheet_details(mock_ws, mock_column_map, mock_first_data_row, "sheet_id", "ws_name")
 
         sheet_id = "test_sheet_id"
         worksheet_name = "test_ws_name"
-        target_dt = datetime.datetime(2023, 10, 30)
+        target_dt = _OCT[30]
         bot_token = "dummy_token"
 
         result = rows.find_row_by_date(sheet_id, worksheet_name, target_dt, bot_token)
 
         self.assertIsNone(result)
         mock_get_details.assert_called_once_with(bot_token)
-        mock_ws.get.assert_called_once() # Check it was called
+        self.assertEqual(mock_ws.get.call_count, client.MAX_REQUEST_ATTEMPTS) # 500 is retried
+
+    def test_find_row_by_date_uses_cached_snapshot(self, mock_get_details):
+        """Test repeated lookups on the same worksheet fetch the date column once."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        mock_ws.get.return_value = [['Oct 25'], [], ['Oct 27']]
+        mock_get_details.return_value = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 0}, 1, "sheet_id", "ws_name")
+
+        first = rows.find_row_by_date("test_sheet_id", "test_ws_name", _OCT[27], "dummy_token")
+        second = rows.find_row_by_date("test_sheet_id", "test_ws_name", _OCT[25], "dummy_token")
+
+        self.assertEqual(first, 3) # Index 2 in the list + first_data_row 1, empty cell keeps alignment
+        self.assertEqual(second, 1)
+        mock_ws.get.assert_called_once()
+
+    def _expire_snapshot(self):
+        """Backdates every cached date snapshot past the TTL."""
+        for key, snapshot in list(rows._date_column_cache.items()):
+            rows._date_column_cache[key] = snapshot._replace(fetched_at=snapshot.fetched_at - rows.DATE_COLUMN_TTL_SECONDS - 1)
+
+    def test_expired_snapshot_refreshed_from_tail(self, mock_get_details):
+        """Test an expired snapshot whose last rows still match is refreshed with a tail-only read."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        dates = [[f'Oct {day}'] for day in range(20, 27)] # Rows 2-8
+        mock_ws.get.return_value = dates
+        mock_get_details.return_value = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 0}, 1, "sheet_id", "ws_name")
+        rows.find_row_by_date("test_sheet_id", "test_ws_name", _OCT[20], "dummy_token")
+        self._expire_snapshot()
+        mock_ws.get.reset_mock()
+        mock_ws.get.return_value = dates[-5:] + [['Oct 27']] # Same tail plus a new row
+
+        result = rows.find_row_by_date("test_sheet_id", "test_ws_name", _OCT[27], "dummy_token")
+
+        self.assertEqual(result, 8)
+        mock_ws.get.assert_called_once_with("A4:A")
+        self.assertEqual(rows.find_row_by_date("test_sheet_id", "test_ws_name", _OCT[20], "dummy_token"), 1)
+
+    def test_expired_snapshot_tail_mismatch_refetches_column(self, mock_get_details):
+        """Test a changed tail falls back to re-reading the whole date column."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        dates = [[f'Oct {day}'] for day in range(20, 27)]
+        mock_ws.get.return_value = dates
+        mock_get_details.return_value = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 0}, 1, "sheet_id", "ws_name")
+        rows.find_row_by_date("test_sheet_id", "test_ws_name", _OCT[20], "dummy_token")
+        self._expire_snapshot()
+        mock_ws.get.reset_mock()
+        shifted = [['Oct 19']] + dates # A row was inserted at the top
+        mock_ws.get.side_effect = [shifted[2:], shifted]
+
+        result = rows.find_row_by_date("test_sheet_id", "test_ws_name", _OCT[20], "dummy_token")
+
+        self.assertEqual(result, 2)
+        self.assertEqual(mock_ws.get.call_args_list, [call("A4:A"), call("A2:A")])
+
+    def test_find_or_locate_insert(self, mock_get_details):
+        """Test the fused lookup reports a hit, or the insert position for a miss, from one read."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        mock_ws.get.return_value = [['Nov 1'], ['Nov 3']]
+        details = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 0}, 5, "sheet_id", "ws_name")
+
+        self.assertEqual(rows._find_or_locate_insert(details, _NOV[3]), (6, 6, 2))
+        self.assertEqual(rows._find_or_locate_insert(details, _NOV[2]), (None, 6, 2))
+        self.assertEqual(rows._find_or_locate_insert(details, _NOV[4]), (None, 7, 2))
+        mock_ws.get.assert_called_once()
 
     # --- Tests for ensure_date_row --- #
 
-    # Patch find_row_by_date used within ensure_date_row
-    @patch('src.services.sheets.rows.find_row_by_date')
-    def test_ensure_date_row_exists(self, mock_find_row, mock_get_details):
+    def test_ensure_date_row_exists(self, mock_get_details):
         """Test ensure_date_row when the date row already exists."""
         existing_row_idx = 10
-        mock_find_row.return_value = existing_row_idx # find_row returns the index
-        mock_ws = MagicMock() # Needed for insert_rows check
+        mock_ws = Mock(spec=gspread.Worksheet) # Needed for insert_rows check
+        mock_ws.get.return_value = [['Oct 31']] * 9 + [['Nov 1']] # Nov 1 at list index 9
         mock_column_map = {'DATE_COL_IDX': 0}
-        mock_get_details.return_value = (mock_ws, mock_column_map, 1, "sheet_id", "ws_name")
+        mock_get_details.return_value = _build_sheet_details(mock_ws, mock_column_map, 1, "sheet_id", "ws_name")
 
         sheet_id = "test_sheet_id"
         worksheet_name = "test_ws_name"
-        target_dt = datetime.datetime(2023, 11, 1)
+        target_dt = _NOV[1]
         bot_token = "dummy_token"
 
         result = rows.ensure_date_row(sheet_id, worksheet_name, target_dt, bot_token)
 
         self.assertEqual(result, existing_row_idx)
         mock_get_details.assert_called_once_with(bot_token)
-        mock_find_row.assert_called_once_with(sheet_id, "ws_name", target_dt, bot_token)
+        mock_ws.get.assert_called_once_with("A2:A")
         mock_ws.insert_rows.assert_not_called() # Should not insert if row exists
 
-    @patch('src.services.sheets.rows.find_row_by_date')
-    def test_ensure_date_row_creates_new(self, mock_find_row, mock_get_details):
+    def test_ensure_date_row_creates_new(self, mock_get_details):
         """Test ensure_date_row when the date row needs to be created."""
-        mock_find_row.return_value = None # Simulate date not found
-        mock_ws = MagicMock()
-        mock_ws.row_count = 10 # Set row count
+        mock_ws = Mock(spec=gspread.Worksheet)
         # Mock getting existing dates for insertion point calculation
         mock_ws.get.return_value = [['Nov 1'], ['Nov 3']]  # FIXED: Use correct format (no leading zero)
         mock_column_map = {'DATE_COL_IDX': 0, 'COL1_IDX': 1} # Need >1 col for row creation size
         mock_first_data_row = 5 # Example start row index
-        mock_get_details.return_value = (mock_ws, mock_column_map, mock_first_data_row, "sheet_id", "ws_name")
+        mock_get_details.return_value = _build_sheet_details(mock_ws, mock_column_map, mock_first_data_row, "sheet_id", "ws_name")
 
         sheet_id = "test_sheet_id"
         worksheet_name = "test_ws_name"
-        target_dt = datetime.datetime(2023, 11, 2) # Target date Nov 2
+        target_dt = _NOV[2] # Target date Nov 2
         formatted_date = "Nov 2" # FIXED: Use correct format
         bot_token = "dummy_token"
 
@@ -146,9 +209,8 @@ class TestSheetsRows(unittest.TestCase):
         expected_insert_index_0based = 6
         self.assertEqual(result, expected_insert_index_0based)
         mock_get_details.assert_called_once_with(bot_token)
-        mock_find_row.assert_called_once_with(sheet_id, "ws_name", target_dt, bot_token)
-        expected_get_range = f"A{mock_first_data_row + 1}:A{mock_ws.row_count}"
-        mock_ws.get.assert_called_once_with(expected_get_range) # Called to find insertion point
+        expected_get_range = f"A{mock_first_data_row + 1}:A"
+        mock_ws.get.assert_called_once_with(expected_get_range) # One fetch for lookup and insertion point
         expected_new_row_data = [None] * len(mock_column_map)
         expected_new_row_data[mock_column_map['DATE_COL_IDX']] = formatted_date
         # gspread insert_rows uses 1-based index
@@ -158,46 +220,204 @@ class TestSheetsRows(unittest.TestCase):
             value_input_option='USER_ENTERED'
         )
 
-    @patch('src.services.sheets.rows.find_row_by_date')
-    def test_ensure_date_row_details_helper_fails(self, mock_find_row, mock_get_details):
+    def test_ensure_date_row_orders_by_month(self, mock_get_details):
+        """Test insertion follows calendar order rather than string order across months."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        mock_ws.get.return_value = [['Jan 2'], ['Apr 10']] # 'Jan 2' > 'Feb 5' as strings
+        mock_get_details.return_value = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 0}, 1, "sheet_id", "ws_name")
+
+        result = rows.ensure_date_row("test_sheet_id", "test_ws_name", datetime.datetime(2024, 2, 5), "dummy_token")
+
+        self.assertEqual(result, 2) # Between Jan 2 (idx 1) and Apr 10 (idx 2)
+        mock_ws.insert_rows.assert_called_once_with([['Feb 5']], row=3, value_input_option='USER_ENTERED')
+
+    def test_insert_replaces_cached_snapshot(self, mock_get_details):
+        """Test an insert swaps in a new snapshot instead of mutating one readers may hold."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        mock_ws.get.return_value = [['Jan 2'], ['Apr 10']]
+        details = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 0}, 1, "sheet_id", "ws_name")
+        mock_get_details.return_value = details
+        before = rows._get_date_column_snapshot(details)
+
+        rows.ensure_date_row("sheet_id", "ws_name", datetime.datetime(2024, 2, 5), "dummy_token")
+
+        after = rows._get_date_column_snapshot(details)
+        self.assertEqual(before.date_strings, ['Jan 2', 'Apr 10'])
+        self.assertEqual(after.date_strings, ['Jan 2', 'Feb 5', 'Apr 10'])
+        self.assertEqual(after.ordinal_rows, [1, 2, 3])
+        self.assertEqual(rows._snapshot_row_for(after, datetime.datetime(2024, 4, 10)), 3)
+        self.assertEqual(rows._snapshot_row_for(before, datetime.datetime(2024, 4, 10)), 2)
+        mock_ws.get.assert_called_once()
+
+    def test_find_or_locate_insert_across_year_end(self, mock_get_details):
+        """Test dates stay in order when the sheet runs from December into January."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        mock_ws.get.return_value = [['Nov 30'], ['Dec 30'], ['Dec 31'], ['Jan 1'], ['Jan 2']]
+        details = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 0}, 1, "sheet_id", "ws_name")
+
+        cases = [
+            (datetime.datetime(2024, 1, 3), 6), # After Jan 2, not above Nov 30
+            (datetime.datetime(2024, 3, 1), 6),
+            (datetime.datetime(2023, 12, 1), 2), # Backfill between Nov 30 and Dec 30
+            (datetime.datetime(2023, 11, 29), 1),
+        ]
+        for target_dt, expected_position in cases:
+            with self.subTest(target_dt=target_dt):
+                self.assertEqual(rows._find_or_locate_insert(details, target_dt), (None, expected_position, 5))
+
+    def test_find_or_locate_insert_same_day_next_year(self, mock_get_details):
+        """Test last year's 'Jan 5' row isn't returned for this year's Jan 5."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        mock_ws.get.return_value = [['Jan 5'], ['Jun 1'], ['Dec 31']]
+        details = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 0}, 1, "sheet_id", "ws_name")
+
+        self.assertEqual(rows._find_or_locate_insert(details, datetime.datetime(2024, 12, 31)), (3, 3, 3))
+        self.assertEqual(rows._find_or_locate_insert(details, datetime.datetime(2025, 1, 5)), (None, 4, 3))
+
+    def test_ensure_date_row_appends_first_day_of_year(self, mock_get_details):
+        """Test Jan 1 after a December-only sheet is appended, and the next day after it."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        mock_ws.get.return_value = [['Dec 30'], ['Dec 31']]
+        mock_get_details.return_value = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 0}, 1, "sheet_id", "ws_name")
+
+        first = rows.ensure_date_row("sheet_id", "ws_name", datetime.datetime(2024, 1, 1), "dummy_token")
+        second = rows.ensure_date_row("sheet_id", "ws_name", datetime.datetime(2024, 1, 2), "dummy_token")
+
+        self.assertEqual((first, second), (3, 4))
+        self.assertEqual(mock_ws.append_row.call_args_list, [
+            call(['Jan 1'], value_input_option='USER_ENTERED', insert_data_option='INSERT_ROWS', table_range="A2:A"),
+            call(['Jan 2'], value_input_option='USER_ENTERED', insert_data_option='INSERT_ROWS', table_range="A2:A"),
+        ])
+        mock_ws.insert_rows.assert_not_called()
+        mock_ws.get.assert_called_once()
+
+    def test_ensure_date_row_details_helper_fails(self, mock_get_details):
         """Test ensure_date_row when _get_bot_sheet_details fails."""
         mock_get_details.return_value = None # Simulate details helper failure
 
         sheet_id = "test_sheet_id"
         worksheet_name = "bad_ws_name"
-        target_dt = datetime.datetime(2023, 11, 3)
+        target_dt = _NOV[3]
         bot_token = "dummy_token_fails"
 
         result = rows.ensure_date_row(sheet_id, worksheet_name, target_dt, bot_token)
 
         self.assertIsNone(result)
         mock_get_details.assert_called_once_with(bot_token)
-        mock_find_row.assert_not_called()
 
-    @patch('src.services.sheets.rows.find_row_by_date')
-    def test_ensure_date_row_insert_error(self, mock_find_row, mock_get_details):
+    def test_ensure_date_row_insert_error(self, mock_get_details):
         """Test ensure_date_row when insert_rows raises an exception."""
-        mock_find_row.return_value = None # Simulate date not found
-        mock_ws = MagicMock()
-        mock_ws.row_count = 5 # Set row count
-        mock_response = MagicMock(spec=requests.Response)
-        mock_ws.insert_rows.side_effect = gspread.exceptions.APIError(mock_response)
-        mock_ws.get.return_value = [] # No existing dates
+        mock_ws = Mock(spec=gspread.Worksheet)
+        mock_ws.insert_rows.side_effect = API_ERROR
+        mock_ws.get.return_value = [['Nov 5']] # Target sorts before this, so a mid-sheet insert
         mock_column_map = {'DATE_COL_IDX': 0}
         mock_first_data_row = 0
-        mock_get_details.return_value = (mock_ws, mock_column_map, mock_first_data_row, "sheet_id", "ws_name")
+        mock_get_details.return_value = _build_sheet_details(mock_ws, mock_column_map, mock_first_data_row, "sheet_id", "ws_name")
 
         sheet_id = "test_sheet_id"
         worksheet_name = "test_ws_name"
-        target_dt = datetime.datetime(2023, 11, 4)
+        target_dt = _NOV[4]
         bot_token = "dummy_token"
 
         result = rows.ensure_date_row(sheet_id, worksheet_name, target_dt, bot_token)
 
         self.assertIsNone(result)
         mock_get_details.assert_called_once_with(bot_token)
-        mock_find_row.assert_called_once_with(sheet_id, "ws_name", target_dt, bot_token)
         mock_ws.insert_rows.assert_called_once() # Check it was called
 
+    def test_ensure_date_row_appends_after_last_date(self, mock_get_details):
+        """Test a date later than all existing ones is appended instead of inserted."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        mock_ws.get.return_value = [['Nov 1'], ['Nov 2']]
+        mock_get_details.return_value = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 0, 'COL1_IDX': 1}, 1, "sheet_id", "ws_name")
+
+        result = rows.ensure_date_row("test_sheet_id", "test_ws_name", _NOV[3], "dummy_token")
+
+        self.assertEqual(result, 3) # After Nov 2 (idx 2)
+        mock_ws.append_row.assert_called_once_with(
+            ['Nov 3'],
+            value_input_option='USER_ENTERED',
+            insert_data_option='INSERT_ROWS',
+            table_range="A2:A"
+        )
+        mock_ws.insert_rows.assert_not_called()
+
+    def test_ensure_date_row_appends_in_date_column(self, mock_get_details):
+        """Test the append is anchored at the configured date column, not column A."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        mock_ws.get.return_value = [['Nov 1'], ['Nov 2']]
+        mock_get_details.return_value = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 2, 'COL1_IDX': 3}, 2, "sheet_id", "ws_name")
+
+        result = rows.ensure_date_row("test_sheet_id", "test_ws_name", _NOV[3], "dummy_token")
+
+        self.assertEqual(result, 4)
+        mock_ws.get.assert_called_once_with("C3:C")
+        mock_ws.append_row.assert_called_once_with(
+            ['Nov 3'],
+            value_input_option='USER_ENTERED',
+            insert_data_option='INSERT_ROWS',
+            table_range="C3:C"
+        )
+
+    @patch('src.services.sheets.client.time.sleep')
+    def test_ensure_date_row_does_not_retry_server_error_on_append(self, mock_sleep, mock_get_details):
+        """Test a 5xx from append_row isn't retried, since the row may already have been added."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        mock_ws.get.return_value = [['Nov 1'], ['Nov 2']]
+        mock_ws.append_row.side_effect = RETRYABLE_API_ERROR
+        mock_get_details.return_value = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 0}, 1, "sheet_id", "ws_name")
+
+        result = rows.ensure_date_row("sheet_id", "ws_name", _NOV[3], "dummy_token")
+
+        self.assertIsNone(result)
+        mock_ws.append_row.assert_called_once()
+        mock_sleep.assert_not_called()
+
+    def test_ensure_date_row_uses_appended_range_from_response(self, mock_get_details):
+        """Test the row index reported by values.append wins over a stale snapshot."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        mock_ws.get.return_value = [['Nov 1'], ['Nov 2']]
+        # Someone added a row below Nov 2 since the date column was read
+        mock_ws.append_row.return_value = {'updates': {'updatedRange': "'My Sheet'!A5:B5"}}
+        mock_get_details.return_value = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 0, 'COL1_IDX': 1}, 1, "sheet_id", "ws_name")
+
+        result = rows.ensure_date_row("sheet_id", "ws_name", _NOV[3], "dummy_token")
+
+        self.assertEqual(result, 4)
+        self.assertNotIn(("sheet_id", "ws_name"), rows._date_column_cache)
+
+    def test_appended_row_idx(self, mock_get_details):
+        """Test parsing the written row out of a values.append response."""
+        self.assertEqual(rows._appended_row_idx({'updates': {'updatedRange': "Sheet1!A47:Z47"}}), 46)
+        self.assertEqual(rows._appended_row_idx({'updates': {'updatedRange': "Sheet1!AB3"}}), 2)
+        self.assertIsNone(rows._appended_row_idx({}))
+        self.assertIsNone(rows._appended_row_idx(None))
+
+    def test_ensure_date_row_updates_snapshot_after_insert(self, mock_get_details):
+        """Test an inserted row is visible to later lookups without refetching."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        mock_ws.get.return_value = [['Nov 1'], ['Nov 3']]
+        mock_get_details.return_value = _build_sheet_details(mock_ws, {'DATE_COL_IDX': 0}, 5, "sheet_id", "ws_name")
+
+        inserted = rows.ensure_date_row("test_sheet_id", "test_ws_name", _NOV[2], "dummy_token")
+
+        self.assertEqual(inserted, 6)
+        self.assertEqual(rows.find_row_by_date("test_sheet_id", "ws_name", _NOV[2], "dummy_token"), 6)
+        self.assertEqual(rows.find_row_by_date("test_sheet_id", "ws_name", _NOV[3], "dummy_token"), 7) # Shifted down
+        mock_ws.get.assert_called_once()
+
+class TestSheetDateOrdinal(unittest.TestCase):
+
+    def test_orders_by_month_then_day(self):
+        """Test keys order chronologically across months, unlike the raw strings."""
+        self.assertLess(rows._sheet_date_ordinal('Jan 2'), rows._sheet_date_ordinal('Apr 10'))
+        self.assertLess(rows._sheet_date_ordinal('Jul 16'), rows._sheet_date_ordinal('Aug 1'))
+        self.assertEqual(rows._sheet_date_ordinal('Feb 29'), 229)
+
+    def test_unparseable_dates(self):
+        """Test malformed or impossible dates return None."""
+        for bad in ('', 'Foo 3', 'Feb 30', 'Jul', 'Jul 0', None):
+            self.assertIsNone(rows._sheet_date_ordinal(bad), bad)
+
 if __name__ == '__main__':
-    unittest.main() 
\ No newline at end of file
+    unittest.main() 
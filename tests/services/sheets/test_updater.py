@@ -1,29 +1,49 @@
 import unittest
-from unittest.mock import patch, MagicMock, call
+from unittest.mock import patch, Mock
 import gspread # Import for exceptions
-import requests
+from types import MappingProxyType
+import time
 from datetime import datetime
 
 # Module to test
-from src.services.sheets import updater
+from src.services.sheets import updater, rows, client
+from src.services.sheets.utils import _build_sheet_details
+from .helpers import API_ERROR, RETRYABLE_API_ERROR
+
+# Shared target dates, keyed by day of November 2023
+_DT = {day: datetime(2023, 11, day) for day in range(1, 18)}
+
+# Column maps shared by most tests; read-only so a test can't leak changes into the next
+_NUTRITION_MAP = MappingProxyType({'DATE_COL_IDX': 0, 'PROTEIN_COL_IDX': 1, 'CARBS_COL_IDX': 2, 'FAT_COL_IDX': 3, 'FIBER_COL_IDX': 4})
+_WEIGHT_MAP = MappingProxyType({'DATE_COL_IDX': 0, 'WEIGHT_COL_IDX': 1})
+
+def _details(ws, column_map=_NUTRITION_MAP):
+    """SheetDetails for a test worksheet whose data starts after one header row."""
+    return _build_sheet_details(ws, column_map, 1, "sheet_id", "ws_name")
 
 # Mock the helper functions used within updater.py
-@patch('src.services.sheets.updater.ensure_date_row') # Mock ensure_date_row used by updater
+@patch('src.services.sheets.updater._ensure_date_row') # Mock _ensure_date_row used by updater
 @patch('src.services.sheets.updater._get_bot_sheet_details') # Mock details helper used by updater
 class TestSheetsUpdater(unittest.TestCase):
 
+    def setUp(self):
+        rows.invalidate_date_column_cache()
+
+    def tearDown(self):
+        rows.invalidate_date_column_cache()
+
     def test_update_metrics_success(self, mock_get_details, mock_ensure_row):
         """Test successful update of metrics."""
-        mock_ws = MagicMock()
+        mock_ws = Mock(spec=gspread.Worksheet)
         mock_column_map = {'DATE_COL_IDX': 0, 'WEIGHT_COL_IDX': 1, 'CALORIES_COL_IDX': 2}
-        mock_get_details.return_value = (mock_ws, mock_column_map, 1, "sheet_id", "ws_name")
+        mock_get_details.return_value = _details(mock_ws, mock_column_map)
         # Mock ensure_date_row returning a valid row index
         target_row_idx = 5
         mock_ensure_row.return_value = target_row_idx
         
         sheet_id = "test_sheet_id"
         worksheet_name = "metrics_ws"
-        target_dt = datetime(2023, 11, 5)
+        target_dt = _DT[5]
         # Keys are 0-based column indices
         metrics_updates = {
             mock_column_map['WEIGHT_COL_IDX']: 75.5, 
@@ -35,29 +55,27 @@ class TestSheetsUpdater(unittest.TestCase):
 
         self.assertTrue(result)
         mock_get_details.assert_called_once_with(bot_token)
-        mock_ensure_row.assert_called_once_with(sheet_id, worksheet_name, target_dt, bot_token)
+        mock_ensure_row.assert_called_once_with(mock_get_details.return_value, target_dt)
         
         # Check batch_update call
         expected_batch_updates = [
-            {'range': f'B{target_row_idx + 1}', 'values': [[75.5]]}, # Col B = idx 1
-            {'range': f'C{target_row_idx + 1}', 'values': [[2100]]} # Col C = idx 2
+            {'range': f'B{target_row_idx + 1}:C{target_row_idx + 1}', 'values': [[75.5, 2100]]}, # Cols B-C = idx 1-2
         ]
         mock_ws.batch_update.assert_called_once_with(expected_batch_updates, value_input_option='USER_ENTERED')
 
     def test_update_metrics_partial_fail_on_batch(self, mock_get_details, mock_ensure_row):
         """Test updating metrics where batch_update fails."""
-        mock_ws = MagicMock()
-        mock_column_map = {'DATE_COL_IDX': 0, 'WEIGHT_COL_IDX': 1}
-        mock_get_details.return_value = (mock_ws, mock_column_map, 1, "sheet_id", "ws_name")
+        mock_ws = Mock(spec=gspread.Worksheet)
+        mock_column_map = _WEIGHT_MAP
+        mock_get_details.return_value = _details(mock_ws, mock_column_map)
         target_row_idx = 5
         mock_ensure_row.return_value = target_row_idx
         # Mock batch_update to raise an error
-        mock_response = MagicMock(spec=requests.Response)
-        mock_ws.batch_update.side_effect = gspread.exceptions.APIError(mock_response)
+        mock_ws.batch_update.side_effect = API_ERROR
 
         sheet_id = "test_sheet_id"
         worksheet_name = "metrics_ws"
-        target_dt = datetime(2023, 11, 6)
+        target_dt = _DT[6]
         metrics_updates = { mock_column_map['WEIGHT_COL_IDX']: 75.0 }
         bot_token = "dummy_token"
 
@@ -65,50 +83,45 @@ class TestSheetsUpdater(unittest.TestCase):
 
         self.assertFalse(result) # Should return False if batch update fails
         mock_get_details.assert_called_once_with(bot_token)
-        mock_ensure_row.assert_called_once_with(sheet_id, worksheet_name, target_dt, bot_token)
+        mock_ensure_row.assert_called_once_with(mock_get_details.return_value, target_dt)
         mock_ws.batch_update.assert_called_once() # Check it was called
         
-    def test_update_metrics_ensure_row_fails(self, mock_get_details, mock_ensure_row):
-        """Test update metrics when ensure_date_row returns None."""
-        mock_ws = MagicMock()
-        mock_column_map = {'DATE_COL_IDX': 0, 'WEIGHT_COL_IDX': 1}
-        mock_get_details.return_value = (mock_ws, mock_column_map, 1, "sheet_id", "ws_name")
-        mock_ensure_row.return_value = None # Simulate ensure_date_row failure
-
-        sheet_id = "test_sheet_id"
-        worksheet_name = "metrics_ws"
-        target_dt = datetime(2023, 11, 7)
-        metrics_updates = { mock_column_map['WEIGHT_COL_IDX']: 75.0 }
-        bot_token = "dummy_token"
-
-        result = updater.update_metrics(sheet_id, worksheet_name, target_dt, metrics_updates, bot_token)
-
-        self.assertFalse(result)
-        mock_get_details.assert_called_once_with(bot_token)
-        mock_ensure_row.assert_called_once_with(sheet_id, worksheet_name, target_dt, bot_token)
-        mock_ws.batch_update.assert_not_called()
-        
-    def test_update_metrics_details_helper_fails(self, mock_get_details, mock_ensure_row):
-        """Test update metrics when _get_bot_sheet_details fails."""
-        mock_get_details.return_value = None # Simulate helper failure
-
-        sheet_id = "test_sheet_id"
-        worksheet_name = "metrics_ws"
-        target_dt = datetime(2023, 11, 8)
-        metrics_updates = { 1: 75.0 } # Example index
+    def test_write_fails_before_touching_sheet(self, mock_get_details, mock_ensure_row):
+        """Test update_metrics/add_nutrition return False without reads or writes when an early step fails."""
+        target_dt = _DT[7]
         bot_token = "dummy_token"
-
-        result = updater.update_metrics(sheet_id, worksheet_name, target_dt, metrics_updates, bot_token)
-
-        self.assertFalse(result)
-        mock_get_details.assert_called_once_with(bot_token)
-        mock_ensure_row.assert_not_called()
+        writes = [
+            ("update_metrics", lambda: updater.update_metrics("test_sheet_id", "metrics_ws", target_dt, {1: 75.0}, bot_token)),
+            ("add_nutrition", lambda: updater.add_nutrition("test_sheet_id", "nutrition_ws", target_dt, bot_token, p=10)),
+        ]
+        for name, write in writes:
+            for failing_step in ("details", "ensure_row"):
+                with self.subTest(name, failing_step=failing_step):
+                    mock_get_details.reset_mock()
+                    mock_ensure_row.reset_mock()
+                    mock_ws = Mock(spec=gspread.Worksheet)
+                    if failing_step == "details":
+                        mock_get_details.return_value = None # Simulate helper failure
+                    else:
+                        mock_get_details.return_value = _details(mock_ws)
+                        mock_ensure_row.return_value = None # Simulate ensure_date_row failure
+
+                    result = write()
+
+                    self.assertFalse(result)
+                    mock_get_details.assert_called_once_with(bot_token)
+                    if failing_step == "details":
+                        mock_ensure_row.assert_not_called()
+                    else:
+                        mock_ensure_row.assert_called_once_with(mock_get_details.return_value, target_dt)
+                    mock_ws.get.assert_not_called()
+                    mock_ws.batch_update.assert_not_called()
 
     def test_update_metrics_no_updates(self, mock_get_details, mock_ensure_row):
         """Test update metrics called with an empty update dict."""
         sheet_id = "test_sheet_id"
         worksheet_name = "metrics_ws"
-        target_dt = datetime(2023, 11, 9)
+        target_dt = _DT[9]
         metrics_updates = {}
         bot_token = "dummy_token"
         
@@ -122,7 +135,7 @@ class TestSheetsUpdater(unittest.TestCase):
 
     def test_add_nutrition_success(self, mock_get_details, mock_ensure_row):
         """Test successfully adding nutrition data."""
-        mock_ws = MagicMock()
+        mock_ws = Mock(spec=gspread.Worksheet)
         # Provide a COMPLETE mock column map for nutrition
         mock_column_map = {
             'DATE_COL_IDX': 0,
@@ -134,14 +147,14 @@ class TestSheetsUpdater(unittest.TestCase):
             'CALORIES_API_COL_IDX': 9, # Example, check updater.py if needed
             'CALORIES_FORMULA_COL_IDX': 10 # Example
         }
-        mock_get_details.return_value = (mock_ws, mock_column_map, 1, "sheet_id", "ws_name")
+        mock_get_details.return_value = _details(mock_ws, mock_column_map)
         target_row_idx = 10
         mock_ensure_row.return_value = target_row_idx
         mock_ws.get.return_value = [[10.0, 20.0, 5.0, 1.0]] 
         
         sheet_id = "test_sheet_id"
         worksheet_name = "nutrition_ws"
-        target_dt = datetime(2023, 11, 10)
+        target_dt = _DT[10]
         bot_token = "dummy_token"
         calories, p, c, f, fi = 500.0, 15.5, 30.0, 10.2, 2.5
 
@@ -149,109 +162,270 @@ class TestSheetsUpdater(unittest.TestCase):
 
         self.assertTrue(result)
         mock_get_details.assert_called_once_with(bot_token)
-        mock_ensure_row.assert_called_once_with(sheet_id, worksheet_name, target_dt, bot_token)
+        mock_ensure_row.assert_called_once_with(mock_get_details.return_value, target_dt)
         expected_get_range = f"F{target_row_idx + 1}:I{target_row_idx + 1}"
         mock_ws.get.assert_called_once_with(expected_get_range, value_render_option='UNFORMATTED_VALUE')
+        # Adjacent P/C/F/Fi columns are written as one range
         expected_batch_updates = [
-            {'range': f'F{target_row_idx + 1}', 'values': [[10.0 + p]]}, 
-            {'range': f'G{target_row_idx + 1}', 'values': [[20.0 + c]]}, 
-            {'range': f'H{target_row_idx + 1}', 'values': [[5.0 + f]]},  
-            {'range': f'I{target_row_idx + 1}', 'values': [[1.0 + fi]]}  
+            {'range': f'F{target_row_idx + 1}:I{target_row_idx + 1}', 'values': [[10.0 + p, 20.0 + c, 5.0 + f, 1.0 + fi]]},
         ]
         mock_ws.batch_update.assert_called_once_with(expected_batch_updates, value_input_option='USER_ENTERED')
 
-    def test_add_nutrition_ensure_row_fails(self, mock_get_details, mock_ensure_row):
-        """Test add_nutrition when ensure_date_row fails."""
-        mock_ws = MagicMock()
-        # Provide a COMPLETE mock column map
-        mock_column_map = {
-            'DATE_COL_IDX': 0, 'PROTEIN_COL_IDX': 1, 'CARBS_COL_IDX': 2, 
-            'FAT_COL_IDX': 3, 'FIBER_COL_IDX': 4
-        }
-        mock_get_details.return_value = (mock_ws, mock_column_map, 1, "sheet_id", "ws_name")
-        mock_ensure_row.return_value = None # Simulate failure
+    def test_add_nutrition_no_values_to_add(self, mock_get_details, mock_ensure_row):
+        """Test add_nutrition when all P, C, F, Fi values are zero or None."""
+        for values in ({'p': 0, 'c': 0, 'f': 0, 'fi': 0}, {'p': None, 'c': 0, 'f': None, 'fi': 0}):
+            with self.subTest(values=values):
+                result = updater.add_nutrition("test_sheet_id", "nutrition_ws", _DT[13], "dummy_token", calories=250, **values)
+
+                self.assertTrue(result) # No update needed is success
+                mock_get_details.assert_not_called() # Nothing to write, so no sheet lookup at all
+                mock_ensure_row.assert_not_called() # No row is created when there is nothing to add
+
+    def test_add_nutrition_batch_update_fails(self, mock_get_details, mock_ensure_row):
+        """Test add_nutrition when the final batch_update fails."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        mock_get_details.return_value = _details(mock_ws)
+        target_row_idx = 5
+        mock_ensure_row.return_value = target_row_idx
+        mock_ws.get.return_value = [[10.0]] # Existing protein (index 1)
+        mock_ws.batch_update.side_effect = API_ERROR
 
         sheet_id = "test_sheet_id"
         worksheet_name = "nutrition_ws"
-        target_dt = datetime(2023, 11, 11)
+        target_dt = _DT[14]
         bot_token = "dummy_token"
 
         result = updater.add_nutrition(sheet_id, worksheet_name, target_dt, bot_token, p=10)
 
         self.assertFalse(result)
         mock_get_details.assert_called_once_with(bot_token)
-        mock_ensure_row.assert_called_once_with(sheet_id, worksheet_name, target_dt, bot_token)
-        mock_ws.get.assert_not_called()
+        mock_ensure_row.assert_called_once_with(mock_get_details.return_value, target_dt)
+        # Check get range based on min/max relevant indices (just Protein=1 here)
+        expected_get_range = f"B{target_row_idx + 1}:B{target_row_idx + 1}"
+        mock_ws.get.assert_called_once_with(expected_get_range, value_render_option='UNFORMATTED_VALUE') 
+        mock_ws.batch_update.assert_called_once() # Check it was called
+
+    def test_add_nutrition_skips_unchanged_cells(self, mock_get_details, mock_ensure_row):
+        """Test cells whose value would not change are not rewritten."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        mock_get_details.return_value = _details(mock_ws)
+        mock_ensure_row.return_value = 5
+        mock_ws.get.return_value = [[1e12]] # Delta below float resolution at this magnitude
+
+        result = updater.add_nutrition("test_sheet_id", "nutrition_ws", _DT[16], "dummy_token", p=1e-6)
+
+        self.assertTrue(result)
         mock_ws.batch_update.assert_not_called()
-        
-    def test_add_nutrition_details_helper_fails(self, mock_get_details, mock_ensure_row):
-        """Test add_nutrition when _get_bot_sheet_details fails."""
-        mock_get_details.return_value = None # Simulate failure
 
-        sheet_id = "test_sheet_id"
-        worksheet_name = "nutrition_ws"
-        target_dt = datetime(2023, 11, 12)
-        bot_token = "dummy_token"
+    @patch('src.services.sheets.client.time.sleep')
+    def test_add_nutrition_range_fetch_fails(self, mock_sleep, mock_get_details, mock_ensure_row):
+        """Test a failed range fetch is retried as one range, never per cell, and nothing is written."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        mock_get_details.return_value = _details(mock_ws)
+        mock_ensure_row.return_value = 5
+        mock_ws.get.side_effect = RETRYABLE_API_ERROR
 
-        result = updater.add_nutrition(sheet_id, worksheet_name, target_dt, bot_token, p=10)
+        result = updater.add_nutrition("test_sheet_id", "nutrition_ws", _DT[15], "dummy_token", p=5, f=2)
 
         self.assertFalse(result)
-        mock_get_details.assert_called_once_with(bot_token)
-        mock_ensure_row.assert_not_called()
-        
-    def test_add_nutrition_no_values_to_add(self, mock_get_details, mock_ensure_row):
-        """Test add_nutrition when all P, C, F, Fi values are zero or None."""
-        mock_ws = MagicMock()
-        # Provide a COMPLETE mock column map
+        self.assertEqual(mock_ws.get.call_count, client.MAX_REQUEST_ATTEMPTS)
+        mock_ws.get.assert_called_with("B6:D6", value_render_option='UNFORMATTED_VALUE')
+        mock_ws.batch_get.assert_not_called()
+        mock_ws.cell.assert_not_called()
+        mock_ws.batch_update.assert_not_called()
+
+    def test_add_nutrition_columns_past_z(self, mock_get_details, mock_ensure_row):
+        """Test ranges use full column letters (AA, AB, ...) and only span non-zero columns."""
+        mock_ws = Mock(spec=gspread.Worksheet)
         mock_column_map = {
-            'DATE_COL_IDX': 0, 'PROTEIN_COL_IDX': 1, 'CARBS_COL_IDX': 2, 
-            'FAT_COL_IDX': 3, 'FIBER_COL_IDX': 4
+            'DATE_COL_IDX': 0, 'PROTEIN_COL_IDX': 26, 'CARBS_COL_IDX': 27,
+            'FAT_COL_IDX': 28, 'FIBER_COL_IDX': 29
         }
-        mock_get_details.return_value = (mock_ws, mock_column_map, 1, "sheet_id", "ws_name")
-        mock_ensure_row.return_value = 5 
+        mock_get_details.return_value = _details(mock_ws, mock_column_map)
+        mock_ensure_row.return_value = 5
+        mock_ws.get.return_value = [[4.0]]
 
-        sheet_id = "test_sheet_id"
-        worksheet_name = "nutrition_ws"
-        target_dt = datetime(2023, 11, 13)
-        bot_token = "dummy_token"
+        result = updater.add_nutrition("test_sheet_id", "nutrition_ws", _DT[17], "dummy_token", c=6)
 
-        result = updater.add_nutrition(sheet_id, worksheet_name, target_dt, bot_token, p=0, c=0, f=0, fi=0)
+        self.assertTrue(result)
+        mock_ws.get.assert_called_once_with("AB6:AB6", value_render_option='UNFORMATTED_VALUE')
+        mock_ws.batch_update.assert_called_once_with([{'range': 'AB6', 'values': [[10.0]]}], value_input_option='USER_ENTERED')
 
-        self.assertTrue(result) # No update needed is success
-        mock_get_details.assert_called_once_with(bot_token)
-        mock_ensure_row.assert_called_once_with(sheet_id, worksheet_name, target_dt, bot_token)
-        mock_ws.get.assert_not_called() 
-        mock_ws.batch_update.assert_not_called()
+    # --- Tests for _apply_row_updates --- #
 
-    def test_add_nutrition_batch_update_fails(self, mock_get_details, mock_ensure_row):
-        """Test add_nutrition when the final batch_update fails."""
-        mock_ws = MagicMock()
-        # Provide a COMPLETE mock column map
+    def test_apply_row_updates_combines_sets_and_increments(self, mock_get_details, mock_ensure_row):
+        """Test sets and increments for one row go out in a single read and a single write."""
+        mock_ws = Mock(spec=gspread.Worksheet)
         mock_column_map = {
-            'DATE_COL_IDX': 0, 'PROTEIN_COL_IDX': 1, 'CARBS_COL_IDX': 2, 
-            'FAT_COL_IDX': 3, 'FIBER_COL_IDX': 4
+            'DATE_COL_IDX': 0, 'WEIGHT_COL_IDX': 1, 'PROTEIN_COL_IDX': 2,
+            'CARBS_COL_IDX': 3, 'FAT_COL_IDX': 4, 'FIBER_COL_IDX': 5
         }
-        mock_get_details.return_value = (mock_ws, mock_column_map, 1, "sheet_id", "ws_name")
-        target_row_idx = 5
-        mock_ensure_row.return_value = target_row_idx
-        mock_ws.get.return_value = [[10.0]] # Existing protein (index 1)
-        mock_response = MagicMock(spec=requests.Response)
-        mock_ws.batch_update.side_effect = gspread.exceptions.APIError(mock_response)
+        mock_ensure_row.return_value = 5
+        mock_ws.get.return_value = [[79.0, 10.0, 20.0]] # Weight, Protein, Carbs
 
-        sheet_id = "test_sheet_id"
-        worksheet_name = "nutrition_ws"
-        target_dt = datetime(2023, 11, 14)
-        bot_token = "dummy_token"
+        written = updater._apply_row_updates(_details(mock_ws, mock_column_map), _DT[5], {2: 5, 3: 2.5}, {1: 80.2})
 
-        result = updater.add_nutrition(sheet_id, worksheet_name, target_dt, bot_token, p=10)
+        self.assertEqual(written, 3)
+        mock_ensure_row.assert_called_once()
+        mock_ws.get.assert_called_once_with("B6:D6", value_render_option='UNFORMATTED_VALUE')
+        mock_ws.batch_update.assert_called_once_with([
+            {'range': 'B6:D6', 'values': [[80.2, 15.0, 22.5]]},
+        ], value_input_option='USER_ENTERED')
 
-        self.assertFalse(result)
-        mock_get_details.assert_called_once_with(bot_token)
-        mock_ensure_row.assert_called_once_with(sheet_id, worksheet_name, target_dt, bot_token)
-        # Check get range based on min/max relevant indices (just Protein=1 here)
-        expected_get_range = f"B{target_row_idx + 1}:B{target_row_idx + 1}"
-        mock_ws.get.assert_called_once_with(expected_get_range, value_render_option='UNFORMATTED_VALUE') 
-        mock_ws.batch_update.assert_called_once() # Check it was called
+    def test_apply_row_updates_skips_unchanged_sets(self, mock_get_details, mock_ensure_row):
+        """Test overwrites matching the values already read for the increments aren't rewritten."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        mock_column_map = {'DATE_COL_IDX': 0, 'WEIGHT_COL_IDX': 1, 'PROTEIN_COL_IDX': 2, 'NOTES_COL_IDX': 3}
+        mock_ensure_row.return_value = 5
+        mock_ws.get.return_value = [[80.5, 10.0, "Run"]] # Weight, Protein, Notes
+
+        written = updater._apply_row_updates(_details(mock_ws, mock_column_map), _DT[5], {2: 5}, {1: "80.5", 3: "Run"})
+
+        self.assertEqual(written, 1)
+        mock_ws.batch_update.assert_called_once_with([{'range': 'C6', 'values': [[15.0]]}], value_input_option='USER_ENTERED')
+
+    def test_apply_row_updates_sets_only_skips_read(self, mock_get_details, mock_ensure_row):
+        """Test plain sets need no read, and unknown columns are skipped."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        mock_ensure_row.return_value = 5
+
+        written = updater._apply_row_updates(_details(mock_ws, _WEIGHT_MAP), _DT[5], {}, {1: 80.2, 9: 1})
+
+        self.assertEqual(written, 1)
+        mock_ws.get.assert_not_called()
+        mock_ws.batch_get.assert_not_called()
+        mock_ws.batch_update.assert_called_once_with([{'range': 'B6', 'values': [[80.2]]}], value_input_option='USER_ENTERED')
+
+    def _seed_stale_snapshot(self, details, date_values):
+        """Caches a date snapshot for details and backdates it past the TTL."""
+        snapshot = rows._store_date_column_snapshot(details, date_values)
+        stale = snapshot._replace(fetched_at=time.monotonic() - rows.DATE_COLUMN_TTL_SECONDS - 1)
+        rows._date_column_cache[(details.sheet_id, details.worksheet_name)] = stale
+
+    def test_add_nutrition_stale_snapshot_uses_one_batch_get(self, mock_get_details, mock_ensure_row):
+        """Test a stale row hint is re-validated and the values read in the same batch_get."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        details = _details(mock_ws)
+        mock_get_details.return_value = details
+        date_values = [['Nov 11'], ['Nov 12'], ['Nov 13'], ['Nov 14'], ['Nov 15']]
+        self._seed_stale_snapshot(details, date_values)
+        mock_ws.batch_get.return_value = [date_values, [[10.0]]]
+
+        result = updater.add_nutrition("test_sheet_id", "nutrition_ws", _DT[15], "dummy_token", p=5)
+
+        self.assertTrue(result)
+        mock_ensure_row.assert_not_called()
+        mock_ws.get.assert_not_called()
+        mock_ws.batch_get.assert_called_once_with(
+            ["A2:A", "B6:B6"],
+            value_render_option='UNFORMATTED_VALUE',
+            date_time_render_option='FORMATTED_STRING'
+        )
+        mock_ws.batch_update.assert_called_once_with([{'range': 'B6', 'values': [[15.0]]}], value_input_option='USER_ENTERED')
+        # The refreshed snapshot is fresh again
+        self.assertEqual(rows._peek_cached_date_row(details, _DT[15]), (5, True))
+
+    def test_add_nutrition_stale_hint_moved_falls_back(self, mock_get_details, mock_ensure_row):
+        """Test a hint invalidated by the fresh date column falls back to ensure_date_row."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        details = _details(mock_ws)
+        mock_get_details.return_value = details
+        self._seed_stale_snapshot(details, [['Nov 11'], ['Nov 12'], ['Nov 13'], ['Nov 14'], ['Nov 15']])
+        # A row was added by hand above Nov 15 since the snapshot was taken
+        moved_dates = [['Nov 10'], ['Nov 11'], ['Nov 12'], ['Nov 13'], ['Nov 14'], ['Nov 15']]
+        mock_ws.batch_get.return_value = [moved_dates, [[99.0]]]
+        mock_ensure_row.return_value = 6
+        mock_ws.get.return_value = [[10.0]]
+
+        result = updater.add_nutrition("test_sheet_id", "nutrition_ws", _DT[15], "dummy_token", p=5)
+
+        self.assertTrue(result)
+        mock_ensure_row.assert_called_once()
+        mock_ws.get.assert_called_once_with("B7:B7", value_render_option='UNFORMATTED_VALUE')
+        mock_ws.batch_update.assert_called_once_with([{'range': 'B7', 'values': [[15.0]]}], value_input_option='USER_ENTERED')
+
+    def test_update_metrics_stale_snapshot_skips_unchanged_values(self, mock_get_details, mock_ensure_row):
+        """Test metric overwrites are compared against the row read with the date column refresh."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        column_map = {'DATE_COL_IDX': 0, 'WEIGHT_COL_IDX': 1, 'STEPS_COL_IDX': 2}
+        details = _details(mock_ws, column_map)
+        mock_get_details.return_value = details
+        date_values = [['Nov 4'], ['Nov 5']]
+        cases = [
+            ({1: "80.5"}, [[80.5]], []), # Same weight: nothing written
+            ({1: 80.5, 2: 10000}, [[80.5, 9000]], [{'range': 'C3', 'values': [[10000]]}]),
+        ]
+        for metric_updates, row_values, expected_updates in cases:
+            with self.subTest(metric_updates=metric_updates):
+                self._seed_stale_snapshot(details, date_values)
+                mock_ws.reset_mock()
+                mock_ws.batch_get.return_value = [date_values, row_values]
+
+                result = updater.update_metrics("test_sheet_id", "metrics_ws", _DT[5], metric_updates, "dummy_token")
+
+                self.assertTrue(result)
+                mock_ensure_row.assert_not_called()
+                mock_ws.batch_get.assert_called_once() # Date column refresh and row read together
+                if expected_updates:
+                    mock_ws.batch_update.assert_called_once_with(expected_updates, value_input_option='USER_ENTERED')
+                else:
+                    mock_ws.batch_update.assert_not_called()
+
+    def test_update_metrics_fresh_snapshot_writes_without_reading(self, mock_get_details, mock_ensure_row):
+        """Test a fresh snapshot means no read at all, so the overwrite is written as is."""
+        mock_ws = Mock(spec=gspread.Worksheet)
+        details = _details(mock_ws, _WEIGHT_MAP)
+        mock_get_details.return_value = details
+        rows._store_date_column_snapshot(details, [['Nov 4'], ['Nov 5']])
+        mock_ensure_row.return_value = 2
+
+        result = updater.update_metrics("test_sheet_id", "metrics_ws", _DT[5], {1: 80.5}, "dummy_token")
+
+        self.assertTrue(result)
+        mock_ws.get.assert_not_called()
+        mock_ws.batch_get.assert_not_called()
+        mock_ws.batch_update.assert_called_once_with([{'range': 'B3', 'values': [[80.5]]}], value_input_option='USER_ENTERED')
+
+
+class TestCoalesceRowUpdates(unittest.TestCase):
+
+    def test_adjacent_columns_merged_into_runs(self):
+        """Test adjacent columns share one range and gaps start a new one."""
+        col_letters = {1: "B", 2: "C", 3: "D", 5: "F"}
+
+        updates = updater._coalesce_row_updates(6, {3: 'f', 1: 'p', 5: 'w', 2: 'c'}, col_letters)
+
+        self.assertEqual(updates, [
+            {'range': 'B6:D6', 'values': [['p', 'c', 'f']]},
+            {'range': 'F6', 'values': [['w']]},
+        ])
+
+class TestCellToNumber(unittest.TestCase):
+
+    def test_numeric_values_used_directly(self):
+        """Test int/float cell values are returned as floats without string parsing."""
+        self.assertEqual(updater._cell_to_number(12, "B2"), 12.0)
+        self.assertEqual(updater._cell_to_number(1.5, "B2"), 1.5)
+
+    def test_text_values_cleaned(self):
+        """Test formatted text numbers are parsed and blanks/non-numerics count as 0."""
+        self.assertEqual(updater._cell_to_number("1,234.5", "B2"), 1234.5)
+        self.assertEqual(updater._cell_to_number("-0.5", "B2"), -0.5)
+        self.assertEqual(updater._cell_to_number(None, "B2"), 0.0)
+        self.assertEqual(updater._cell_to_number("  ", "B2"), 0.0)
+        with self.assertLogs('src.services.sheets.updater', level='WARNING'):
+            self.assertEqual(updater._cell_to_number("n/a", "B2"), 0.0)
+        with self.assertLogs('src.services.sheets.updater', level='WARNING'):
+            self.assertEqual(updater._cell_to_number("nan", "B2"), 0.0)
+
+    def test_is_unchanged(self):
+        """Test only clear-cut matches between read and written values count as unchanged."""
+        self.assertTrue(updater._is_unchanged(80.5, 80.5))
+        self.assertTrue(updater._is_unchanged(930, " 0930"))
+        self.assertTrue(updater._is_unchanged(None, ""))
+        self.assertFalse(updater._is_unchanged(80.5, "80.6"))
+        self.assertFalse(updater._is_unchanged(None, 0))
+        self.assertFalse(updater._is_unchanged(45000.5, "9:30"))
 
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
@@ -1,28 +1,98 @@
 import unittest
 import datetime
+from unittest.mock import patch, MagicMock, call
 
 # Module to test
 from src.services.sheets import utils
 
 class TestSheetsUtils(unittest.TestCase):
 
-    def test_format_date_for_sheet_basic(self):
-        """Test standard date formatting."""
-        dt = datetime.datetime(2023, 10, 27, 15, 30)
-        expected = "Oct 27"
-        self.assertEqual(utils.format_date_for_sheet(dt), expected)
-
-    def test_format_date_for_sheet_different_date(self):
-        """Test a different date, including single-digit day."""
-        dt = datetime.datetime(2024, 1, 5, 0, 0)
-        expected = "Jan 5"
-        self.assertEqual(utils.format_date_for_sheet(dt), expected)
+    def test_format_date_for_sheet(self):
+        """Test dates format as 'Mon D', without zero-padding or year, for date and datetime inputs."""
+        cases = [
+            (datetime.datetime(2023, 10, 27, 15, 30), "Oct 27"),
+            (datetime.datetime(2024, 1, 5, 0, 0), "Jan 5"), # Single-digit day
+            (datetime.date(2024, 7, 16), "Jul 16"), # Plain date
+        ]
+        for dt, expected in cases:
+            with self.subTest(dt=dt):
+                self.assertEqual(utils.format_date_for_sheet(dt), expected)
 
     def test_format_date_for_sheet_requires_datetime(self):
         """Test that input must be a datetime object."""
         with self.assertRaises(AttributeError):
             # Passing a string instead of datetime should fail
             utils.format_date_for_sheet("2023-10-27") # type: ignore
-            
+
+    def test_col_letter(self):
+        """Test 0-based column indices map to A1 column letters, including past Z."""
+        self.assertEqual(utils._col_letter(0), "A")
+        self.assertEqual(utils._col_letter(25), "Z")
+        self.assertEqual(utils._col_letter(26), "AA")
+
+    def test_build_sheet_details_sparse_column_map(self):
+        """Test num_columns covers the highest mapped index, not the map size."""
+        details = utils._build_sheet_details(None, {'DATE_COL_IDX': 1, 'WEIGHT_COL_IDX': 5, 'WATER_COL_IDX': 9}, 1, 'sheet_id', 'ws_name')
+
+        self.assertEqual(details.num_columns, 10)
+        self.assertEqual(details.date_col_letter, "B")
+        self.assertEqual(details.valid_col_indices, frozenset({1, 5, 9}))
+        self.assertEqual(details.col_letters, {1: "B", 5: "F", 9: "J"})
+        self.assertEqual(details.date_col_range, "B2:B")
+
+
+@patch('src.services.sheets.utils._get_worksheet')
+@patch('src.services.sheets.utils.get_config')
+class TestBotSheetDetailsCache(unittest.TestCase):
+
+    def setUp(self):
+        utils._bot_schema_cache.clear()
+        self.bot_config = {
+            'google_sheet_id': 'sheet_id',
+            'worksheet_name': 'ws_name',
+            'column_map': {'DATE_COL_IDX': 0},
+            'first_data_row': 1,
+        }
+
+    def tearDown(self):
+        utils._bot_schema_cache.clear()
+
+    def test_schema_memoized_per_token(self, mock_get_config, mock_get_ws):
+        """Test the bot config is validated once, while the worksheet comes from the client cache."""
+        mock_get_config.return_value.get_bot_config_by_token.return_value = self.bot_config
+        mock_ws = MagicMock()
+        mock_get_ws.return_value = mock_ws
+
+        first = utils._get_bot_sheet_details("dummy_token")
+        second = utils._get_bot_sheet_details("dummy_token")
+
+        self.assertIs(first.worksheet, mock_ws)
+        self.assertEqual(first.column_map, {'DATE_COL_IDX': 0})
+        self.assertEqual((first.first_data_row, first.sheet_id, first.worksheet_name), (1, 'sheet_id', 'ws_name'))
+        self.assertEqual(first, second)
+        self.assertEqual(first.date_col_idx, 0)
+        self.assertIsNone(first.protein_idx)
+        self.assertIsNone(utils._bot_schema_cache["dummy_token"].worksheet)
+        mock_get_config.return_value.get_bot_config_by_token.assert_called_once_with("dummy_token")
+        self.assertEqual(mock_get_ws.call_args_list, [call('sheet_id', 'ws_name')] * 2)
+
+    def test_missing_worksheet_returns_none(self, mock_get_config, mock_get_ws):
+        """Test a worksheet that can't be opened yields None, keeping the validated schema."""
+        mock_get_config.return_value.get_bot_config_by_token.return_value = self.bot_config
+        mock_get_ws.return_value = None
+
+        self.assertIsNone(utils._get_bot_sheet_details("dummy_token"))
+        self.assertIn("dummy_token", utils._bot_schema_cache)
+
+    def test_failed_lookup_not_cached(self, mock_get_config, mock_get_ws):
+        """Test a failed lookup is retried on the next call."""
+        mock_get_config.return_value.get_bot_config_by_token.return_value = None
+
+        self.assertIsNone(utils._get_bot_sheet_details("dummy_token"))
+        self.assertIsNone(utils._get_bot_sheet_details("dummy_token"))
+
+        self.assertEqual(mock_get_config.return_value.get_bot_config_by_token.call_count, 2)
+        mock_get_ws.assert_not_called()
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file
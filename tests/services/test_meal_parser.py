@@ -0,0 +1,58 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+# Module to test
+from src.services import meal_parser
+
+class TestMealParser(unittest.TestCase):
+
+    def test_coerce_meal_item(self):
+        """Test well-formed entries are normalized and malformed ones rejected."""
+        cases = [
+            ({"item": "rice", "quantity_g": 180}, {"item": "rice", "quantity_g": 180.0}), # int quantity becomes float
+            ({"item": "egg", "quantity_g": 50.5, "extra": "ignored"}, {"item": "egg", "quantity_g": 50.5}),
+            ({"item": "rice"}, None), # Missing quantity
+            ({"item": None, "quantity_g": 10}, None),
+            ({"item": "rice", "quantity_g": "180"}, None), # Quantity must be numeric
+            (["rice", 180], None), # Not an object
+        ]
+        for entry, expected in cases:
+            with self.subTest(entry=entry):
+                self.assertEqual(meal_parser._coerce_meal_item(entry), expected)
+
+    def test_strip_code_fence(self):
+        """Test a surrounding ``` or ```json fence is removed and unfenced text is only trimmed."""
+        cases = [
+            ('```json\n[{"item": "egg"}]\n```', '[{"item": "egg"}]'),
+            ('```JSON\n[]\n```\n', '[]'),
+            ('```\n{"calories": 70}\n```', '{"calories": 70}'),
+            ('  [{"item": "egg"}]  ', '[{"item": "egg"}]'),
+        ]
+        for text, expected in cases:
+            with self.subTest(text=text):
+                self.assertEqual(meal_parser.strip_code_fence(text), expected)
+
+    @patch('src.services.meal_parser.AIModelManager')
+    def test_parse_meal_text_keeps_valid_items(self, MockAIModelManager):
+        """Test invalid entries are dropped (and logged) while valid ones are returned."""
+        MockAIModelManager.generate_content.return_value = SimpleNamespace(
+            text='```json\n[{"item": "chicken breast", "quantity_g": 150}, {"item": "broccoli"}]\n```'
+        )
+
+        with self.assertLogs('src.services.meal_parser', level='WARNING') as logs:
+            result = meal_parser.parse_meal_text_with_gemini("150g chicken breast and some broccoli")
+
+        self.assertEqual(result, [{"item": "chicken breast", "quantity_g": 150.0}])
+        self.assertEqual(len(logs.records), 2) # The bad entry, then the summary
+        self.assertIn("{'item': 'broccoli'}", logs.output[0])
+
+    @patch('src.services.meal_parser.AIModelManager')
+    def test_parse_meal_text_no_valid_items(self, MockAIModelManager):
+        """Test None is returned when no entry is valid."""
+        MockAIModelManager.generate_content.return_value = SimpleNamespace(text='[{"item": 1, "quantity_g": 2}]')
+
+        self.assertIsNone(meal_parser.parse_meal_text_with_gemini("mystery"))
+
+if __name__ == '__main__':
+    unittest.main()